@@ -1,29 +1,28 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
-from config import SECRET_KEY, ALGORITHM
-from database.session import get_db
-from models.user import User
-from crud.user import is_token_blacklisted
-from fastapi_limiter import FastAPILimiter
-import redis
-from fastapi import FastAPI
+from jose import JWTError
+from database.session import Database, get_db
+from auth.jwt import decode_token, get_token_id
+from auth.revocation import revocation_store
+from auth.user_cache import get_cached_user, cache_user
+from crud.user import get_user
 
-app = FastAPI()
-
-redis_client = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-@app.on_event("startup")
-async def startup():
-    await FastAPILimiter.init(redis_client)
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Database = Depends(get_db)):
+    revoked_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token is invalid")
 
+    if revocation_store.sync_due():
+        await db.run(revocation_store.sync)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    if is_token_blacklisted(db, token):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token is invalid")
+    cached = get_cached_user(token)
+    if cached is not None:
+        token_id, cached_user = cached
+        if revocation_store.is_revoked(token_id):
+            raise revoked_exception
+        request.state.user_id = cached_user.id
+        return cached_user
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,15 +31,26 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("type") == "refresh":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    token_id = get_token_id(payload, token)
+    if revocation_store.is_revoked(token_id):
+        raise revoked_exception
+
+    user = await db.run(get_user, username)
     if user is None:
         raise credentials_exception
 
+    request.state.user_id = user.id
+    return cache_user(token, token_id, user, payload.get("exp"))
+
+
+async def get_current_admin(user=Depends(get_current_user)):
+    if user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     return user
@@ -1,4 +1,18 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_QUEUE_TIMEOUT
+from utils import metrics
+
+logger = logging.getLogger(__name__)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -8,3 +22,96 @@ def verify_password(plain_password: str, hashed_password: str):
 def get_password_hash(password: str):
     return pwd_context.hash(password)
 
+
+# bcrypt is CPU bound and holds the GIL, so hashes run in a dedicated process
+# pool instead of the request threadpool. At most PASSWORD_HASH_WORKERS hashes
+# run at once and PASSWORD_HASH_MAX_PENDING more may wait; anything beyond that
+# waits up to PASSWORD_HASH_QUEUE_TIMEOUT seconds for a slot and is then
+# rejected with 503.
+#
+# Workers are started through a forkserver: ProcessPoolExecutor spawns them on
+# first use, when the server already runs threads, and a plain fork of a
+# multi-threaded process can leave children stuck on inherited locks.
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_waiting = 0
+_in_pool = 0
+
+
+def start_password_pool():
+    """Creates the hashing pool; called from the startup hook before any request runs"""
+    global _executor, _slots
+    if _slots is not None:
+        return
+    _slots = asyncio.Semaphore(max(PASSWORD_HASH_WORKERS, 1) + PASSWORD_HASH_MAX_PENDING)
+    if PASSWORD_HASH_WORKERS > 0:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context(method)
+        )
+        logger.info(f"Started password hashing pool with {PASSWORD_HASH_WORKERS} workers ({method})")
+
+
+def _get_slots() -> asyncio.Semaphore:
+    if _slots is None:
+        start_password_pool()
+    return _slots
+
+
+async def _run(func, *args):
+    global _waiting, _in_pool
+    slots = _get_slots()
+    queued_at = time.perf_counter()
+    _waiting += 1
+    try:
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=PASSWORD_HASH_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            metrics.inc("password_hash_rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": "1"},
+            )
+    finally:
+        _waiting -= 1
+
+    _in_pool += 1
+    try:
+        if _executor is not None:
+            result = await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+        else:
+            result = await run_in_threadpool(func, *args)
+    finally:
+        _in_pool -= 1
+        slots.release()
+
+    metrics.observe(f"{func.__name__}_latency", time.perf_counter() - queued_at)
+    return result
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run(get_password_hash, password)
+
+
+def shutdown_password_pool():
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _slots = None
+
+
+def password_pool_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "waiting": _waiting,
+        "in_pool": _in_pool,
+    }
+
+
+metrics.register_collector("password_hash_pool", password_pool_stats)
@@ -1,3 +1,5 @@
+import hashlib
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -7,11 +9,18 @@ from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_T
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def create_refresh_token(data: dict):
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = data.copy()
-    to_encode.update({"exp": expire})
+def create_refresh_token(data: dict, expires_at: Optional[datetime] = None):
+    expire = expires_at or datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = {"jti": uuid.uuid4().hex, **data}
+    to_encode.update({"exp": expire, "type": "refresh"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_token(token: str, verify_exp: bool = True) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": verify_exp})
+
+def get_token_id(payload: dict, token: str) -> str:
+    """Returns the token's jti, or a digest of the token for tokens issued before jti was added"""
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()[:32]
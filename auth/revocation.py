@@ -0,0 +1,85 @@
+import datetime
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from config import REVOCATION_SYNC_SECONDS, REVOCATION_PURGE_SECONDS
+from crud.token import revoke_token, get_revoked_tokens, purge_expired_tokens
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Revocations written by other workers are picked up on the next sync; rows are
+# re-read with this much overlap so clock skew between workers cannot hide one.
+SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+
+class RevocationStore:
+    """In-memory set of revoked token ids backed by the revoked_tokens table.
+
+    Every worker keeps only the ids of tokens that have not expired yet and
+    pulls new rows from the table whenever `sync_due` says so, so the
+    per-request check is a dictionary lookup. Expired rows (and expired
+    refresh sessions) are purged by whichever worker notices first.
+    """
+
+    def __init__(self, sync_seconds: float, purge_seconds: float):
+        self.sync_seconds = sync_seconds
+        self.purge_seconds = purge_seconds
+        self._revoked: Dict[str, float] = {}
+        self._high_water: Optional[datetime.datetime] = None
+        self._synced_at = float("-inf")
+        self._purged_at = time.monotonic()
+        self._sync_lock = threading.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def revoke(self, db: Session, jti: str, expires_at: Optional[float]) -> None:
+        if expires_at is None or expires_at <= time.time():
+            return
+
+        revoke_token(db, jti, datetime.datetime.utcfromtimestamp(expires_at))
+        self._revoked[jti] = expires_at
+        metrics.inc("token_revocations")
+
+    def sync_due(self) -> bool:
+        return time.monotonic() - self._synced_at >= self.sync_seconds
+
+    def sync(self, db: Session) -> None:
+        if not self._sync_lock.acquire(blocking=False):
+            return
+
+        try:
+            since = None if self._high_water is None else self._high_water - SYNC_OVERLAP
+            for row in get_revoked_tokens(db, since):
+                self._revoked[row.jti] = row.expires_at.replace(tzinfo=datetime.timezone.utc).timestamp()
+                if self._high_water is None or row.revoked_at > self._high_water:
+                    self._high_water = row.revoked_at
+            if self._high_water is None:
+                self._high_water = datetime.datetime.utcnow()
+
+            now = time.time()
+            for jti in [jti for jti, expires_at in list(self._revoked.items()) if expires_at <= now]:
+                self._revoked.pop(jti, None)
+
+            if time.monotonic() - self._purged_at >= self.purge_seconds:
+                self._purged_at = time.monotonic()
+                purged = purge_expired_tokens(db)
+                if purged:
+                    logger.info(f"Purged {purged} expired token revocations and refresh sessions")
+
+            self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def stats(self) -> dict:
+        return {"size": len(self._revoked)}
+
+
+revocation_store = RevocationStore(REVOCATION_SYNC_SECONDS, REVOCATION_PURGE_SECONDS)
+metrics.register_collector("token_revocations", revocation_store.stats)
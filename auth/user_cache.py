@@ -0,0 +1,60 @@
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from config import TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS
+from models.user import User
+from utils import metrics
+from utils.cache import TTLCache
+
+# Verified access token -> (token id, CachedUser). Entries never outlive the
+# token itself, and are dropped on logout and whenever the user's row changes
+# in this process.
+# TOKEN_CACHE_TTL_SECONDS bounds how long another worker may keep serving a
+# snapshot after a change made elsewhere.
+user_cache = TTLCache(TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS)
+metrics.register_collector("token_cache", user_cache.stats)
+
+_tokens_by_user: Dict[int, Set[str]] = {}
+_lock = threading.Lock()
+
+
+class CachedUser:
+    """Detached, read-only copy of a User row's columns"""
+
+    def __init__(self, user: User):
+        for column in User.__table__.columns:
+            setattr(self, column.key, getattr(user, column.key))
+
+    def __repr__(self):
+        return f"<CachedUser id={self.id} username={self.username!r}>"
+
+
+def get_cached_user(token: str) -> Optional[Tuple[str, CachedUser]]:
+    return user_cache.get(token)
+
+
+def cache_user(token: str, token_id: str, user: User, expires_at: Optional[float] = None) -> CachedUser:
+    snapshot = CachedUser(user)
+    ttl = None if expires_at is None else expires_at - time.time()
+    user_cache.set(token, (token_id, snapshot), ttl)
+
+    with _lock:
+        tokens = _tokens_by_user.setdefault(snapshot.id, set())
+        tokens.add(token)
+        if len(tokens) > 16:
+            tokens.intersection_update(t for t in tokens if t in user_cache)
+
+    return snapshot
+
+
+def invalidate_token(token: str) -> None:
+    user_cache.pop(token)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drops every cached token of the user so the next request reloads the row"""
+    with _lock:
+        tokens = _tokens_by_user.pop(user_id, set())
+    for token in tokens:
+        user_cache.pop(token)
@@ -0,0 +1,118 @@
+"""Benchmark of the POST /plan/ ingestion path (parse, validate, log, dump).
+
+Compares the previous pipeline (json.loads, an indented re-dump for the
+log, PlanCreate(**data), .dict() per day and full-body INFO logs) with the
+current one (PlanCreate.model_validate_json and a single model_dump, with
+sampled DEBUG logging disabled at INFO).
+
+    python -m benchmarks.plan_ingest [--days 6] [--exercises 8] [--runs 200]
+"""
+import argparse
+import io
+import json
+import logging
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schemas.plan import PlanCreate  # noqa: E402
+
+
+def build_plan(days: int, exercises: int) -> bytes:
+    """A plan shaped like the ones the app sends: full catalog metadata on every exercise"""
+    return json.dumps({
+        "start_date": "2026-01-05T00:00:00",
+        "days": [
+            {
+                "dayIndex": day,
+                "part": "upper body" if day % 2 else "lower body",
+                "exercises": [
+                    {
+                        "id": f"{day:02d}{index:04d}",
+                        "name": f"Exercise {day}-{index}",
+                        "sets": 4,
+                        "reps": "8-12",
+                        "rest": "90s",
+                        "restSec": 90,
+                        "bodyPart": "chest",
+                        "equipment": "barbell",
+                        "gifUrl": f"/static/assets/gifs/{day:02d}{index:04d}.gif",
+                        "target": "pectorals",
+                        "secondaryTargets": ["triceps", "shoulders"],
+                        "instructions": [
+                            f"Step {step}: keep your core braced, control the movement and breathe steadily."
+                            for step in range(8)
+                        ],
+                        "programs": ["strength", "hypertrophy"],
+                        "locations": ["gym"],
+                        "experienceLevels": ["beginner", "intermediate", "advanced"],
+                        "durationSec": 45,
+                    }
+                    for index in range(exercises)
+                ],
+            }
+            for day in range(days)
+        ],
+    }).encode()
+
+
+def previous_pipeline(body: bytes, logger: logging.Logger):
+    raw_data = body.decode()
+    logger.info(f"Raw request body: {raw_data}")
+    json_data = json.loads(raw_data)
+    logger.info(f"Parsed JSON data: {json.dumps(json_data, indent=2)}")
+    plan = PlanCreate(**json_data)
+    return [day.dict(exclude_unset=True) for day in plan.days]
+
+
+def current_pipeline(body: bytes, logger: logging.Logger):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Plan body: {body[:2048].decode(errors='replace')}")
+    plan = PlanCreate.model_validate_json(body)
+    logger.info(f"Received plan: {len(plan.days)} days, {len(body)} bytes")
+    return plan.model_dump(include={"days"}, exclude_unset=True)["days"]
+
+
+def measure(pipeline, body: bytes, runs: int, logger: logging.Logger) -> float:
+    pipeline(body, logger)
+    started = time.perf_counter()
+    for _ in range(runs):
+        pipeline(body, logger)
+    return (time.perf_counter() - started) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=6)
+    parser.add_argument("--exercises", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    body = build_plan(args.days, args.exercises)
+    assert previous_pipeline(body, logging.getLogger("noop")) == current_pipeline(body, logging.getLogger("noop"))
+
+    # Log records are formatted and written as they would be in production
+    log_output = io.StringIO()
+    logger = logging.getLogger("benchmarks.plan_ingest")
+    logger.addHandler(logging.StreamHandler(log_output))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    results = {}
+    for name, pipeline in (("previous", previous_pipeline), ("current", current_pipeline)):
+        log_output.seek(0)
+        log_output.truncate()
+        seconds = measure(pipeline, body, args.runs, logger)
+        results[name] = seconds
+        print(f"{name:>8}: {seconds * 1000:8.3f} ms/plan, {log_output.tell() / (args.runs + 1):10.0f} log bytes/plan")
+
+    print(f"payload: {len(body)} bytes, {args.days} days x {args.exercises} exercises")
+    print(f"speedup: {results['previous'] / results['current']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,57 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_ASYNC = os.getenv("DB_ASYNC", "true").lower() == "true"
+# Creates the tables of an empty database at startup (and stamps it at the
+# latest migration) instead of running `alembic upgrade head`
+DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL")
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
 
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 10000))
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", 60))
+REVOCATION_SYNC_SECONDS = int(os.getenv("REVOCATION_SYNC_SECONDS", 5))
+REVOCATION_PURGE_SECONDS = int(os.getenv("REVOCATION_PURGE_SECONDS", 3600))
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 5))
+
+PROGRESS_SUMMARY_CACHE_SIZE = int(os.getenv("PROGRESS_SUMMARY_CACHE_SIZE", 10000))
+PROGRESS_SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("PROGRESS_SUMMARY_CACHE_TTL_SECONDS", 300))
+
+PLAN_LOG_SAMPLE_RATE = float(os.getenv("PLAN_LOG_SAMPLE_RATE", 0.01))
+PLAN_LOG_MAX_BYTES = int(os.getenv("PLAN_LOG_MAX_BYTES", 2048))
+
+EXERCISE_CATALOG_REFRESH_SECONDS = int(os.getenv("EXERCISE_CATALOG_REFRESH_SECONDS", 300))
+# Store only per-user exercise fields in plans; set to false to keep full exercises
+PLAN_STORAGE_COMPACT = os.getenv("PLAN_STORAGE_COMPACT", "true").lower() == "true"
+
+PLAN_RESPONSE_CACHE_SIZE = int(os.getenv("PLAN_RESPONSE_CACHE_SIZE", 2000))
+PLAN_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("PLAN_RESPONSE_CACHE_TTL_SECONDS", 3600))
+# Also keep a gzip copy of cached plan responses of at least this many bytes; 0 disables
+PLAN_RESPONSE_GZIP_MIN_BYTES = int(os.getenv("PLAN_RESPONSE_GZIP_MIN_BYTES", 1024))
+
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+WATER_DAILY_GOAL = float(os.getenv("WATER_DAILY_GOAL", 2000))
+
+REDIS_URL = os.getenv("REDIS_URL")
+# Comma-separated proxy IPs whose X-Forwarded-For is trusted for the client
+# address; start.sh passes it to uvicorn. Without it every client behind a
+# reverse proxy shares the proxy's rate limit.
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
 
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
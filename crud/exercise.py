@@ -0,0 +1,212 @@
+import datetime
+import threading
+import time
+from typing import Dict, Iterable, List
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from config import EXERCISE_CATALOG_REFRESH_SECONDS
+from database.upsert import upsert_many
+from models.exercise import Exercise
+from schemas.exercise import CatalogExercise
+from utils import metrics
+
+# Exercise fields that describe the exercise itself and live in the catalog.
+# Everything else (id, sets, reps, rest, restSec, notes, durationSec, ...) is
+# per-user and stays in the plan days.
+CATALOG_FIELDS = (
+    "name",
+    "bodyPart",
+    "equipment",
+    "gifUrl",
+    "target",
+    "secondaryTargets",
+    "instructions",
+    "programs",
+    "locations",
+    "experienceLevels",
+)
+
+# Compact plan exercises list the catalog fields dropped from them under this
+# key, so hydration restores exactly those and nothing else
+COMPACTED_FIELDS_KEY = "_catalog"
+
+
+class CatalogEmpty(Exception):
+    """The exercise catalog has no entries; it has not been imported yet"""
+
+
+class ExerciseCatalog:
+    """Read-mostly, in-process copy of the exercises table.
+
+    Catalog rows are only written by import_exercises, from trusted data and
+    never from user plans, so the cache is reloaded in full every
+    EXERCISE_CATALOG_REFRESH_SECONDS and ids it does not know yet are fetched
+    on demand. `version` changes whenever the content does, which lets
+    derived indexes know when to rebuild. It is a per-process counter;
+    `shared_version` identifies the loaded table content the same way in
+    every worker (see catalog_version_columns).
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.version = 0
+        self.shared_version = None
+        self._entries: Dict[str, dict] = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def expired(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    def _store(self, rows, replace: bool = False):
+        entries = {row.id: row.data for row in rows}
+        with self._lock:
+            if replace:
+                if entries != self._entries:
+                    self.version += 1
+                self._entries = entries
+                self.shared_version = (
+                    max((row.updated_at for row in rows if row.updated_at is not None), default=None),
+                    len(rows),
+                )
+                self._loaded_at = time.monotonic()
+            elif entries:
+                self._entries = {**self._entries, **entries}
+                self.version += 1
+
+    def load(self, db: Session):
+        self._store(db.query(Exercise.id, Exercise.data, Exercise.updated_at).all(), replace=True)
+
+    def sync(self, db: Session, shared_version):
+        """Reloads the cache unless it already holds the table at `shared_version`"""
+        if self.shared_version != shared_version:
+            self.load(db)
+
+    def get_many(self, db: Session, ids: Iterable[str]) -> Dict[str, dict]:
+        if self.expired():
+            self.load(db)
+        ids = set(ids)
+        missing = [exercise_id for exercise_id in ids if exercise_id not in self._entries]
+        if missing:
+            self._store(db.query(Exercise.id, Exercise.data).filter(Exercise.id.in_(missing)).all())
+        entries = self._entries
+        return {exercise_id: entries[exercise_id] for exercise_id in ids if exercise_id in entries}
+
+    def all(self, db: Session) -> Dict[str, dict]:
+        if self.expired():
+            self.load(db)
+        return self._entries
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "version": self.version}
+
+
+catalog = ExerciseCatalog(EXERCISE_CATALOG_REFRESH_SECONDS)
+
+
+def catalog_version_columns():
+    """(latest updated_at, row count) of the exercises table, as scalar subqueries.
+
+    Imports set updated_at on every row they write, so this changes with the
+    content and, unlike ExerciseCatalog.version, is the same in every worker.
+    """
+    return (
+        select(func.max(Exercise.updated_at)).scalar_subquery(),
+        select(func.count()).select_from(Exercise).scalar_subquery(),
+    )
+metrics.register_collector("exercise_catalog", catalog.stats)
+
+
+def _exercises(days: List[dict]):
+    for day in days:
+        for exercise in day.get("exercises") or []:
+            if exercise.get("id") is not None:
+                yield exercise
+
+
+def import_exercises(db: Session, exercises: List[CatalogExercise]) -> int:
+    """Adds or replaces catalog entries from a trusted source, e.g. an exercise database export.
+
+    This is the only writer of the catalog: plan uploads are looked up in
+    it but never added, so one user's exercise data cannot reach another
+    user's plan. Returns the number of entries written.
+    """
+    now = datetime.datetime.utcnow()
+    rows = {}
+    for exercise in exercises:
+        entry = exercise.model_dump(include=set(CATALOG_FIELDS), exclude_none=True)
+        rows[exercise.id] = {
+            "id": exercise.id,
+            "name": exercise.name,
+            "body_part": exercise.bodyPart,
+            "data": entry,
+            "updated_at": now,
+        }
+    upsert_many(db, Exercise, list(rows.values()), index_elements=["id"],
+                update_columns=["name", "body_part", "data", "updated_at"])
+    db.commit()
+    catalog.load(db)
+    return len(rows)
+
+
+def get_catalog_entries(db: Session, days: List[dict]) -> Dict[str, dict]:
+    """Catalog entries of the exercises in the plan days"""
+    return catalog.get_many(db, {str(exercise["id"]) for exercise in _exercises(days)})
+
+
+def _without_marker(exercise: dict) -> dict:
+    return {key: value for key, value in exercise.items() if key != COMPACTED_FIELDS_KEY}
+
+
+def compact_days(days: List[dict], entries: Dict[str, dict]) -> List[dict]:
+    """Drops the catalog fields that equal the catalog value from hydrated plan days.
+
+    The dropped fields are listed under COMPACTED_FIELDS_KEY; fields that
+    differ are kept, so hydrating the result gives back what the client sent.
+    """
+    compacted = []
+    for day in days:
+        exercises = []
+        for exercise in day.get("exercises") or []:
+            exercise = _without_marker(exercise)
+            entry = entries.get(str(exercise.get("id")), {})
+            removed = [field for field in CATALOG_FIELDS if field in exercise and field in entry
+                       and entry[field] == exercise[field]]
+            if removed:
+                exercise = {key: value for key, value in exercise.items() if key not in removed}
+                exercise[COMPACTED_FIELDS_KEY] = removed
+            exercises.append(exercise)
+        compacted.append({**day, "exercises": exercises})
+    return compacted
+
+
+def hydrate_days(db: Session, days: List[dict]) -> List[dict]:
+    """Fills the catalog fields that compaction dropped back into plan days"""
+    entries = catalog.get_many(db, {
+        str(exercise["id"]) for exercise in _exercises(days) if exercise.get(COMPACTED_FIELDS_KEY)
+    })
+    hydrated = []
+    for day in days:
+        exercises = []
+        for exercise in day.get("exercises") or []:
+            entry = entries.get(str(exercise.get("id")), {})
+            restored = {field: entry[field] for field in exercise.get(COMPACTED_FIELDS_KEY) or () if field in entry}
+            exercises.append({**restored, **_without_marker(exercise)})
+        hydrated.append({**day, "exercises": exercises})
+    return hydrated
+
+
+def strip_days(days: List[dict]) -> List[dict]:
+    """Compact plan days without the compaction bookkeeping: the stored per-user fields only"""
+    return [
+        {**day, "exercises": [_without_marker(exercise) for exercise in day.get("exercises") or []]}
+        for day in days
+    ]
+
+
+def hydrate_plan(db: Session, plan, hydrate: bool = True) -> dict:
+    """The plan in the /plan/ response shape"""
+    return {
+        "start_date": plan.start_date,
+        "days": hydrate_days(db, plan.days) if hydrate else strip_days(plan.days),
+    }
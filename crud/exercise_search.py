@@ -0,0 +1,244 @@
+import re
+import threading
+from bisect import bisect_right
+from heapq import nsmallest
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from crud.exercise import catalog
+from utils import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields matched by free-text queries
+TEXT_FIELDS = ("name", "bodyPart", "target", "equipment", "secondaryTargets")
+
+# Fields that can be filtered on and are counted in facets
+FACET_FIELDS = ("bodyPart", "target", "equipment")
+
+# Query tokens shorter than this are matched as word prefixes, longer ones
+# as substrings through the n-gram index
+NGRAM = 3
+
+# Resolved query tokens kept per index version
+MATCH_CACHE_SIZE = 10000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _ngrams(token: str):
+    return {token[i:i + NGRAM] for i in range(len(token) - NGRAM + 1)}
+
+
+def _normalize(value) -> Optional[str]:
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+class _IndexSnapshot:
+    """One version of the index. Never changed once published, except for its match cache."""
+
+    def __init__(self):
+        self.version = None
+        self.docs: Dict[str, dict] = {}
+        self.all: FrozenSet[str] = frozenset()
+        self.words: Dict[str, FrozenSet[str]] = {}
+        self.prefixes: Dict[str, FrozenSet[str]] = {}
+        self.ngrams: Dict[str, FrozenSet[str]] = {}  # n-gram -> words containing it
+        self.matches: Dict[str, FrozenSet[str]] = {}
+        self.facets: Dict[str, Dict[str, FrozenSet[str]]] = {field: {} for field in FACET_FIELDS}
+        self.facet_labels: Dict[str, Dict[str, str]] = {field: {} for field in FACET_FIELDS}
+        self.sort_keys: Dict[str, Tuple[str, str]] = {}
+        self.order: List[Tuple[str, str]] = []
+        self.rank: Dict[str, int] = {}  # position in order
+        self.doc_facets: Dict[str, Dict[str, str]] = {field: {} for field in FACET_FIELDS}
+
+    @staticmethod
+    def _post(postings: dict, key: str, item: str):
+        postings[key] = postings.get(key, frozenset()) | {item}
+
+    def extend(self, version, entries: Dict[str, dict]) -> "_IndexSnapshot":
+        """A new snapshot with `entries` added; this one is left as it is"""
+        doc_words = {}
+        for exercise_id, entry in entries.items():
+            words = set()
+            for field in TEXT_FIELDS:
+                value = entry.get(field)
+                for text in value if isinstance(value, list) else [value]:
+                    if isinstance(text, str):
+                        words.update(_tokens(text))
+            doc_words[exercise_id] = frozenset(words)
+
+        new = _IndexSnapshot()
+        new.version = version
+        new.docs = {**self.docs, **entries}
+        new.all = frozenset(new.docs)
+        new.sort_keys = {
+            **self.sort_keys,
+            **{exercise_id: (str(entry.get("name", "")).lower(), exercise_id) for exercise_id, entry in entries.items()},
+        }
+        # Posting sets are frozen, so the copies can share them
+        new.words = dict(self.words)
+        new.prefixes = dict(self.prefixes)
+        new.ngrams = dict(self.ngrams)
+        new.facets = {field: dict(postings) for field, postings in self.facets.items()}
+        new.facet_labels = {field: dict(labels) for field, labels in self.facet_labels.items()}
+        new.doc_facets = {field: dict(values) for field, values in self.doc_facets.items()}
+
+        for exercise_id, words in doc_words.items():
+            for word in words:
+                for length in range(1, min(len(word), NGRAM - 1) + 1):
+                    self._post(new.prefixes, word[:length], exercise_id)
+                if word not in new.words:
+                    for ngram in _ngrams(word):
+                        self._post(new.ngrams, ngram, word)
+                self._post(new.words, word, exercise_id)
+            for field in FACET_FIELDS:
+                label = entries[exercise_id].get(field)
+                value = _normalize(label)
+                if value is not None:
+                    new.facet_labels[field].setdefault(value, label.strip())
+                    new.doc_facets[field][exercise_id] = value
+                    self._post(new.facets[field], value, exercise_id)
+        new.order = sorted(new.sort_keys.values())
+        new.rank = {exercise_id: position for position, (_, exercise_id) in enumerate(new.order)}
+        return new
+
+    def match(self, token: str) -> FrozenSet[str]:
+        matches = self.matches
+        ids = matches.get(token)
+        if ids is not None:
+            return ids
+        if len(token) < NGRAM:
+            ids = self.prefixes.get(token, frozenset())
+        else:
+            words = None
+            for ngram in _ngrams(token):
+                postings = self.ngrams.get(ngram, frozenset())
+                words = postings if words is None else words & postings
+                if not words:
+                    break
+            # A word can contain all of the token's n-grams without containing the token
+            word_postings = self.words
+            ids = frozenset().union(*(word_postings[word] for word in words if token in word))
+        if len(matches) >= MATCH_CACHE_SIZE:
+            matches.clear()
+        matches[token] = ids
+        return ids
+
+
+class ExerciseSearchIndex:
+    """In-memory inverted index over the exercise catalog.
+
+    Built from the catalog on first use (or at startup) and extended with the
+    entries added since whenever the catalog version changes (rebuilt when
+    existing entries changed). An update
+    builds a new snapshot and publishes it with a single assignment, and a
+    search reads the snapshot once, so searches need no lock while an
+    update runs.
+    """
+
+    def __init__(self):
+        self._snapshot = _IndexSnapshot()
+        self._lock = threading.Lock()
+
+    def stale(self) -> bool:
+        """Whether refresh() has work to do (possibly a catalog reload)"""
+        return catalog.expired() or catalog.version != self._snapshot.version
+
+    def refresh(self, db: Session):
+        version = catalog.version
+        entries = catalog.all(db)
+        if version == self._snapshot.version:
+            return
+        with self._lock:
+            snapshot = self._snapshot
+            if version == snapshot.version:
+                return
+            if any(entries.get(exercise_id) != entry for exercise_id, entry in snapshot.docs.items()):
+                # Exercises were removed or re-imported with new data: start over
+                snapshot = _IndexSnapshot()
+            new_ids = entries.keys() - snapshot.docs.keys()
+            self._snapshot = snapshot = snapshot.extend(
+                version, {exercise_id: entries[exercise_id] for exercise_id in new_ids}
+            )
+            logger.info(f"Exercise search index: {len(new_ids)} added, {len(snapshot.docs)} total")
+
+    def search(self, query: Optional[str] = None, filters: Optional[Dict[str, str]] = None,
+               limit: int = 50, after: Optional[Tuple[str, str]] = None) -> dict:
+        """Exercises matching every query token and filter, ordered by name.
+
+        Facet counts cover all matches, not just the returned page; each one
+        ignores its own filter so that clients can offer the alternatives.
+        """
+        snapshot = self._snapshot
+        everything = snapshot.all
+        matched = None
+        for token in set(_tokens(query or "")):
+            postings = snapshot.match(token)
+            matched = postings if matched is None else matched & postings
+
+        selected = {
+            field: snapshot.facets[field].get(_normalize(value), frozenset())
+            for field, value in (filters or {}).items() if _normalize(value) is not None
+        }
+        result = everything if matched is None else matched & everything
+        for postings in selected.values():
+            result = result & postings
+
+        facets = {}
+        for field in FACET_FIELDS:
+            base = everything if matched is None else matched
+            for other, postings in selected.items():
+                if other != field:
+                    base = base & postings
+            if base is everything:
+                counts = {value: len(postings) for value, postings in snapshot.facets[field].items()}
+            else:
+                counts = {}
+                values = snapshot.doc_facets[field]
+                for exercise_id in base:
+                    value = values.get(exercise_id)
+                    if value is not None:
+                        counts[value] = counts.get(value, 0) + 1
+            labels = snapshot.facet_labels[field]
+            facets[field] = {
+                labels[value]: count
+                for value, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])) if count
+            }
+
+        order, rank = snapshot.order, snapshot.rank
+        start = bisect_right(order, tuple(after)) if after else 0
+        if result is everything:
+            page = [exercise_id for _, exercise_id in order[start:start + limit + 1]]
+        else:
+            page = nsmallest(
+                limit + 1,
+                (exercise_id for exercise_id in result if rank.get(exercise_id, -1) >= start),
+                key=rank.__getitem__,
+            )
+        return {
+            "total": len(result),
+            "items": [{**snapshot.docs[exercise_id], "id": exercise_id} for exercise_id in page],
+            "facets": facets,
+        }
+
+    def get(self, exercise_id: str) -> Optional[dict]:
+        entry = self._snapshot.docs.get(exercise_id)
+        return None if entry is None else {**entry, "id": exercise_id}
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "documents": len(snapshot.docs),
+            "words": len(snapshot.words),
+            "ngrams": len(snapshot.ngrams),
+            "catalog_version": snapshot.version,
+        }
+
+
+exercise_search = ExerciseSearchIndex()
+metrics.register_collector("exercise_search", exercise_search.stats)
@@ -1,12 +1,25 @@
+import datetime
+from pydantic import ValidationError
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from models.plan import Plan
-from schemas.plan import PlanCreate
+from models.plan import Plan, PlanDay
+from config import PLAN_STORAGE_COMPACT
+from crud.exercise import CATALOG_FIELDS, catalog, get_catalog_entries, compact_days, hydrate_days
+from crud.exercise import catalog_version_columns
+from crud.plan_response import invalidate_plan_response
+from crud.progress_summary import invalidate_progress_summary
+from crud.sync import record_tombstone
+from schemas.plan import DayInfo, PlanCreate
 import logging
 from typing import List, Dict, Any
 
 logger = logging.getLogger(__name__)
 
 
+class PlanVersionConflict(Exception):
+    """The plan changed after the version the client based its edit on"""
+
+
 def get_user_plan(db: Session, user_id: int) -> Plan:
     """Gets the user's training plan"""
     try:
@@ -21,16 +34,38 @@ def get_user_plan(db: Session, user_id: int) -> Plan:
         raise
 
 
+def get_plan_version(db: Session, user_id: int):
+    """updated_at of the user's plan, without loading the plan itself"""
+    return db.query(Plan.updated_at).filter(Plan.user_id == user_id).scalar()
+
+
+def get_plan_response_version(db: Session, user_id: int, hydrate: bool = True):
+    """Version of the user's /plan/ response, or None without a plan.
+
+    A hydrated response also carries catalog data, so its version is
+    (updated_at, catalog version) and changes when the catalog is re-imported.
+    """
+    if not hydrate:
+        return get_plan_version(db, user_id)
+    row = db.query(Plan.updated_at, *catalog_version_columns()).filter(Plan.user_id == user_id).first()
+    return None if row is None else (row[0], (row[1], row[2]))
+
+
 def save_plan(db: Session, user_id: int, plan: PlanCreate) -> Plan:
     """Saves or updates the user's training plan"""
     try:
         db_plan = get_user_plan(db, user_id)
 
         # Save days and exercises as is without transformation
-        days_data = [day.dict(exclude_unset=True) for day in plan.days]
+        days_data = plan.model_dump(include={"days"}, exclude_unset=True)["days"]
+        if PLAN_STORAGE_COMPACT:
+            days_data = compact_days(days_data, get_catalog_entries(db, days_data))
 
         if db_plan:
             logger.info(f"Updating existing plan for user {user_id}")
+            if db_plan.days != days_data:
+                # Day rows change without touching the plan row, so bump it here
+                db_plan.updated_at = datetime.datetime.utcnow()
             db_plan.start_date = plan.start_date
             db_plan.days = days_data
         else:
@@ -44,6 +79,8 @@ def save_plan(db: Session, user_id: int, plan: PlanCreate) -> Plan:
 
         db.commit()
         db.refresh(db_plan)
+        invalidate_progress_summary(user_id)
+        invalidate_plan_response(user_id)
         logger.info(f"Plan saved successfully for user {user_id}")
         return db_plan
 
@@ -56,10 +93,100 @@ def save_plan(db: Session, user_id: int, plan: PlanCreate) -> Plan:
 def delete_user_plan(db: Session, user_id: int) -> None:
     """Deletes the user's training plan"""
     try:
-        db.query(Plan).filter(Plan.user_id == user_id).delete()
+        db.query(PlanDay).filter(
+            PlanDay.plan_id.in_(select(Plan.id).where(Plan.user_id == user_id))
+        ).delete(synchronize_session=False)
+        if db.query(Plan).filter(Plan.user_id == user_id).delete():
+            record_tombstone(db, user_id, "plan")
         db.commit()
+        invalidate_progress_summary(user_id)
+        invalidate_plan_response(user_id)
         logger.info(f"Plan deleted for user {user_id}")
     except Exception as e:
         logger.error(f"Error deleting plan for user {user_id}: {str(e)}")
         db.rollback()
-        raise
\ No newline at end of file
+        raise
+
+
+def _edit_plan_day(db: Session, user_id: int, day_index: int, edit, expected_updated_at=None):
+    """Applies `edit` to one day, leaving the plan's other days untouched.
+
+    `edit(day)` gets the hydrated day and returns the new one, or None when
+    there is nothing to edit. The result is validated as a DayInfo, so an
+    edit cannot store a day that later reads would fail on (ValidationError
+    is raised instead). With `expected_updated_at`, the plan's version is compared and
+    bumped in one UPDATE so that concurrent edits cannot both succeed.
+    Returns (hydrated day, new updated_at), or None when not found.
+    """
+    try:
+        row = (
+            db.query(PlanDay)
+            .join(Plan, Plan.id == PlanDay.plan_id)
+            .filter(Plan.user_id == user_id, PlanDay.day_index == day_index)
+            .order_by(PlanDay.position)
+            .first()
+        )
+        if row is None:
+            return None
+        day = edit(hydrate_days(db, [row.data])[0])
+        if day is None:
+            return None
+        day = DayInfo.model_validate(day).model_dump(exclude_unset=True)
+        stored = compact_days([day], get_catalog_entries(db, [day]))[0] if PLAN_STORAGE_COMPACT else day
+
+        updated_at = datetime.datetime.utcnow()
+        stmt = update(Plan).where(Plan.id == row.plan_id).values(updated_at=updated_at)
+        if expected_updated_at is not None:
+            stmt = stmt.where(Plan.updated_at == expected_updated_at)
+        if db.execute(stmt).rowcount == 0:
+            db.rollback()
+            raise PlanVersionConflict()
+
+        row.day_index = day.get("dayIndex", row.day_index)
+        row.data = stored
+        db.commit()
+        invalidate_progress_summary(user_id)
+        invalidate_plan_response(user_id)
+        logger.info(f"Plan day {day_index} updated for user {user_id}")
+        return day, updated_at
+
+    except PlanVersionConflict:
+        logger.info(f"Plan version conflict for user {user_id} on day {day_index}")
+        raise
+    except ValidationError as e:
+        logger.info(f"Invalid edit of plan day {day_index} for user {user_id}: {str(e)}")
+        db.rollback()
+        raise
+    except Exception as e:
+        logger.error(f"Error updating plan day {day_index} for user {user_id}: {str(e)}")
+        db.rollback()
+        raise
+
+
+def update_plan_day(db: Session, user_id: int, day_index: int, changes: Dict[str, Any], expected_updated_at=None):
+    """Replaces the given fields of one plan day"""
+    return _edit_plan_day(db, user_id, day_index, lambda day: {**day, **changes}, expected_updated_at)
+
+
+def update_plan_exercise(db: Session, user_id: int, day_index: int, exercise_id: str, changes: Dict[str, Any],
+                         expected_updated_at=None):
+    """Replaces the given fields of one exercise of a plan day"""
+
+    def edit(day):
+        exercises = list(day.get("exercises") or [])
+        for position, exercise in enumerate(exercises):
+            if str(exercise.get("id")) == exercise_id:
+                break
+        else:
+            return None
+        if "id" in changes and str(changes["id"]) != exercise_id:
+            # Swapped for another exercise: keep the per-user fields, take the rest from the catalog
+            exercise = {
+                **catalog.get_many(db, [str(changes["id"])]).get(str(changes["id"]), {}),
+                **{key: value for key, value in exercise.items() if key not in CATALOG_FIELDS},
+            }
+        exercises[position] = {**exercise, **changes}
+        return {**day, "exercises": exercises}
+
+    return _edit_plan_day(db, user_id, day_index, edit, expected_updated_at)
+
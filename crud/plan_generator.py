@@ -0,0 +1,145 @@
+import threading
+from collections import defaultdict
+from datetime import datetime
+from itertools import chain, product, zip_longest
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from crud.exercise import CatalogEmpty, catalog
+from schemas.plan import PlanCreate
+from utils import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Catalog entries without programs / locations / experienceLevels suit any value
+ANY = None
+
+# Body parts trained on each day of the cycle, by catalog bodyPart
+SPLIT = (
+    ("Chest & Arms", ("chest", "upper arms")),
+    ("Back & Shoulders", ("back", "shoulders")),
+    ("Legs & Core", ("upper legs", "lower legs", "waist")),
+)
+
+# sets, reps, restSec by training experience
+VOLUME = {
+    "beginner": (3, "10-12", 90),
+    "intermediate": (4, "8-10", 90),
+    "advanced": (4, "6-8", 120),
+}
+DEFAULT_VOLUME = VOLUME["intermediate"]
+
+IndexKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+def _normalize(value) -> Optional[str]:
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+class CatalogIndex:
+    """Exercise ids of the catalog keyed by (program, location, level, bodyPart).
+
+    Rebuilt whenever the catalog version changes. Lookups merge the exact key
+    with the ANY keys of entries that leave a dimension open, and remember the
+    merged result until the next rebuild.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._index: Dict[IndexKey, List[str]] = {}
+        self._resolved: Dict[IndexKey, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _build(self, entries: Dict[str, dict]) -> Dict[IndexKey, List[str]]:
+        index = defaultdict(list)
+        for exercise_id, entry in entries.items():
+            body_part = _normalize(entry.get("bodyPart"))
+            if body_part is None:
+                continue
+            dimensions = [
+                {_normalize(value) for value in entry.get(field) or []} - {None} or {ANY}
+                for field in ("programs", "locations", "experienceLevels")
+            ]
+            for program, location, level in product(*dimensions):
+                index[(program, location, level, body_part)].append(exercise_id)
+        return {key: sorted(ids) for key, ids in index.items()}
+
+    def refresh(self, db: Session):
+        # Read the version first: a concurrent reload then only causes an extra rebuild
+        version = catalog.version
+        entries = catalog.all(db)
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._index = self._build(entries)
+                self._resolved = {}
+                self._version = version
+                logger.info(f"Rebuilt exercise index: {len(self._index)} keys, catalog version {version}")
+
+    def lookup(self, program: Optional[str], location: Optional[str], level: Optional[str], body_part: str) -> List[str]:
+        key = (_normalize(program), _normalize(location), _normalize(level), _normalize(body_part))
+        ids = self._resolved.get(key)
+        if ids is None:
+            program, location, level, body_part = key
+            ids = sorted({
+                exercise_id
+                for combination in product({program, ANY}, {location, ANY}, {level, ANY})
+                for exercise_id in self._index.get((*combination, body_part), ())
+            })
+            self._resolved[key] = ids
+        return ids
+
+    def stats(self) -> dict:
+        return {"keys": len(self._index), "resolved": len(self._resolved), "catalog_version": self._version}
+
+
+exercise_index = CatalogIndex()
+metrics.register_collector("exercise_index", exercise_index.stats)
+
+
+def generate_plan(db: Session, user, days: int = 3, exercises_per_day: int = 6,
+                  start_date: Optional[datetime] = None) -> Optional[PlanCreate]:
+    """Builds a plan for the user's training settings from the exercise catalog.
+
+    Days cycle through SPLIT, and a body part's exercises rotate across the
+    cycles so repeated days differ. Returns None when no catalog exercise
+    matches the settings and raises CatalogEmpty when there is no catalog.
+    """
+    exercise_index.refresh(db)
+    entries = catalog.all(db)
+    if not entries:
+        raise CatalogEmpty()
+    sets, reps, rest_sec = VOLUME.get(_normalize(user.training_experience), DEFAULT_VOLUME)
+
+    plan_days = []
+    for day_index in range(days):
+        part, body_parts = SPLIT[day_index % len(SPLIT)]
+        cycle = day_index // len(SPLIT)
+        candidates = [
+            exercise_index.lookup(user.training_program, user.training_location, user.training_experience, body_part)
+            for body_part in body_parts
+        ]
+
+        # Interleave the day's body parts, each rotated to where the previous
+        # cycle of this day left off
+        quota = -(-exercises_per_day // len(body_parts))
+        rotated = [ids[cycle * quota % len(ids):] + ids[:cycle * quota % len(ids)] for ids in candidates if ids]
+        picked = []
+        for exercise_id in chain.from_iterable(zip_longest(*rotated)):
+            if exercise_id is not None and exercise_id not in picked:
+                picked.append(exercise_id)
+        picked = picked[:exercises_per_day]
+
+        plan_days.append({
+            "dayIndex": day_index,
+            "part": part,
+            "exercises": [
+                {**entries[exercise_id], "id": exercise_id, "sets": sets, "reps": reps, "restSec": rest_sec}
+                for exercise_id in picked
+            ],
+        })
+
+    if not any(day["exercises"] for day in plan_days):
+        return None
+    return PlanCreate(start_date=start_date or datetime.utcnow(), days=plan_days)
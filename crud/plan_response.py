@@ -0,0 +1,65 @@
+import gzip
+import json
+from typing import NamedTuple, Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from config import PLAN_RESPONSE_CACHE_SIZE, PLAN_RESPONSE_CACHE_TTL_SECONDS, PLAN_RESPONSE_GZIP_MIN_BYTES
+from crud.exercise import catalog, catalog_version_columns, hydrate_plan
+from models.plan import Plan
+from schemas.plan import PlanOut
+from utils import metrics
+from utils.cache import TTLCache
+
+
+class PlanResponse(NamedTuple):
+    version: object  # what the body was built from, see crud.plan.get_plan_response_version
+    body: bytes
+    gzip_body: Optional[bytes]
+
+
+# user_id -> {hydrate: PlanResponse}. Callers pass the response's current
+# version, so bodies cached before another worker changed the plan or
+# re-imported the catalog are never served.
+plan_response_cache = TTLCache(PLAN_RESPONSE_CACHE_SIZE, PLAN_RESPONSE_CACHE_TTL_SECONDS)
+metrics.register_collector("plan_response_cache", plan_response_cache.stats)
+
+
+def invalidate_plan_response(user_id: int):
+    plan_response_cache.pop(user_id)
+
+
+def get_cached_plan_response(user_id: int, version, hydrate: bool) -> Optional[PlanResponse]:
+    cached = plan_response_cache.get(user_id)
+    response = cached.get(hydrate) if cached is not None else None
+    if response is None or response.version != version:
+        return None
+    return response
+
+
+def _serialize(payload: dict, hydrate: bool) -> bytes:
+    if hydrate:
+        return PlanOut.model_validate(payload).model_dump_json().encode()
+    # Compact exercises lack the catalog fields PlanOut requires
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def build_plan_response(db: Session, user_id: int, hydrate: bool = True) -> Optional[PlanResponse]:
+    """Loads, hydrates and serializes the user's plan once, then caches the bytes"""
+    plan = db.query(Plan).filter(Plan.user_id == user_id).first()
+    if plan is None:
+        return None
+
+    version = plan.updated_at
+    if hydrate:
+        # Hydrate from the catalog content the version names, not from a
+        # cache another worker's import has made stale
+        catalog.sync(db, tuple(db.query(*catalog_version_columns()).one()))
+        version = (plan.updated_at, catalog.shared_version)
+    body = _serialize(hydrate_plan(db, plan, hydrate), hydrate)
+    gzip_body = None
+    if PLAN_RESPONSE_GZIP_MIN_BYTES and len(body) >= PLAN_RESPONSE_GZIP_MIN_BYTES:
+        gzip_body = gzip.compress(body, compresslevel=6)
+    response = PlanResponse(version, body, gzip_body)
+
+    plan_response_cache.set(user_id, {**(plan_response_cache.get(user_id) or {}), hydrate: response})
+    return response
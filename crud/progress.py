@@ -1,11 +1,30 @@
 import datetime
+from typing import List, Optional
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
+from crud.progress_summary import invalidate_progress_summary
+from crud.sync import record_tombstone
+from crud.workout import get_current_sets, lock_workout_month, log_workout_events
+from database.upsert import upsert, upsert_many
 from models.progress import Progress
 from schemas.progress import ProgressCreate
 
 
-def get_progress(db: Session, user_id: int):
-    return db.query(Progress).filter(Progress.user_id == user_id).all()
+def get_progress(db: Session, user_id: int, limit: Optional[int] = None, after: Optional[tuple] = None):
+    """Progress entries ordered by (day_index, exercise_id), starting after the key `after`"""
+    query = db.query(Progress).filter(Progress.user_id == user_id)
+    if after is not None:
+        query = query.filter(tuple_(Progress.day_index, Progress.exercise_id) > after)
+    return query.order_by(Progress.day_index, Progress.exercise_id).limit(limit).all()
+
+
+def get_progress_version(db: Session, user_id: int):
+    """(count, latest completed_at) of the user's entries, from the (user_id, completed_at) index"""
+    return tuple(
+        db.query(func.count(Progress.id), func.max(Progress.completed_at))
+        .filter(Progress.user_id == user_id)
+        .one()
+    )
 
 
 def get_day_progress(db: Session, user_id: int, day_index: int):
@@ -17,34 +36,62 @@ def get_day_progress(db: Session, user_id: int, day_index: int):
 
 
 def upsert_progress(db: Session, user_id: int, entry: ProgressCreate):
-    db_entry = (
-        db.query(Progress)
-        .filter(
-            Progress.user_id == user_id,
-            Progress.day_index == entry.day_index,
-            Progress.exercise_id == entry.exercise_id
-        )
-        .first()
+    completed_at = datetime.datetime.utcnow()
+    lock_workout_month(db, user_id, completed_at)
+    previous = get_current_sets(db, user_id, [(entry.day_index, entry.exercise_id)])
+    db_entry = upsert(
+        db,
+        Progress,
+        values={
+            "user_id": user_id,
+            "day_index": entry.day_index,
+            "exercise_id": entry.exercise_id,
+            "sets_completed": entry.sets_completed,
+            "completed_at": completed_at,
+        },
+        index_elements=["user_id", "day_index", "exercise_id"],
+        set_={"sets_completed": entry.sets_completed, "completed_at": completed_at},
     )
+    log_workout_events(db, user_id, [entry], previous, completed_at)
+    db.commit()
+    invalidate_progress_summary(user_id)
+    return db_entry
+
 
-    if db_entry:
-        db_entry.sets_completed = entry.sets_completed
-        db_entry.completed_at = datetime.datetime.utcnow()
-    else:
-        db_entry = Progress(
-            user_id=user_id,
-            day_index=entry.day_index,
-            exercise_id=entry.exercise_id,
-            sets_completed=entry.sets_completed,
-            completed_at=datetime.datetime.utcnow()
-        )
-        db.add(db_entry)
+def upsert_progress_batch(db: Session, user_id: int, entries: List[ProgressCreate]):
+    """Applies a whole session's entries with one multi-row upsert in one transaction.
 
+    When an exercise appears more than once, the last entry wins.
+    """
+    completed_at = datetime.datetime.utcnow()
+    rows = {
+        (entry.day_index, entry.exercise_id): {
+            "user_id": user_id,
+            "day_index": entry.day_index,
+            "exercise_id": entry.exercise_id,
+            "sets_completed": entry.sets_completed,
+            "completed_at": completed_at,
+        }
+        for entry in entries
+    }
+    lock_workout_month(db, user_id, completed_at)
+    previous = get_current_sets(db, user_id, list(rows))
+    db_entries = upsert_many(
+        db,
+        Progress,
+        list(rows.values()),
+        index_elements=["user_id", "day_index", "exercise_id"],
+        update_columns=["sets_completed", "completed_at"],
+    )
+    latest = {(entry.day_index, entry.exercise_id): entry for entry in entries}
+    log_workout_events(db, user_id, list(latest.values()), previous, completed_at)
     db.commit()
-    db.refresh(db_entry)
-    return db_entry
+    invalidate_progress_summary(user_id)
+    return sorted(db_entries, key=lambda entry: (entry.day_index, entry.exercise_id))
 
 
 def delete_all_user_progress(db: Session, user_id: int):
     db.query(Progress).filter(Progress.user_id == user_id).delete()
-    db.commit()
\ No newline at end of file
+    record_tombstone(db, user_id, "progress")
+    db.commit()
+    invalidate_progress_summary(user_id)
\ No newline at end of file
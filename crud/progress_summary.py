@@ -0,0 +1,88 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from config import PROGRESS_SUMMARY_CACHE_SIZE, PROGRESS_SUMMARY_CACHE_TTL_SECONDS
+from models.plan import Plan
+from models.progress import Progress
+from utils import metrics
+from utils.cache import TTLCache
+
+# user_id -> (version, summary). The version (plan updated_at, progress count
+# and latest completed_at) is re-read on every request, so a summary cached
+# by one worker is never served after another worker changed the data.
+summary_cache = TTLCache(PROGRESS_SUMMARY_CACHE_SIZE, PROGRESS_SUMMARY_CACHE_TTL_SECONDS)
+metrics.register_collector("progress_summary_cache", summary_cache.stats)
+
+
+def invalidate_progress_summary(user_id: int):
+    summary_cache.pop(user_id)
+
+
+def _get_version(db: Session, user_id: int):
+    """(plan updated_at, progress count, latest completed_at) in one round trip"""
+    return tuple(db.execute(select(
+        select(Plan.updated_at).where(Plan.user_id == user_id).scalar_subquery(),
+        select(func.count(Progress.id)).where(Progress.user_id == user_id).scalar_subquery(),
+        select(func.max(Progress.completed_at)).where(Progress.user_id == user_id).scalar_subquery(),
+    )).one())
+
+
+def _ratio(done: int, total: int) -> float:
+    return round(done / total, 4) if total else 0.0
+
+
+def build_summary(days: list, progress) -> dict:
+    """Joins plan days with progress rows on (day_index, exercise_id)"""
+    sets_done = {(entry.day_index, entry.exercise_id): entry.sets_completed for entry in progress}
+
+    day_summaries = []
+    for position, day in enumerate(days):
+        day_index = day.get("dayIndex", position)
+        total_sets = completed_sets = exercises_completed = 0
+        exercises = day.get("exercises") or []
+        for exercise in exercises:
+            sets = exercise.get("sets") or 0
+            done = min(sets_done.get((day_index, exercise.get("id")), 0), sets)
+            total_sets += sets
+            completed_sets += done
+            exercises_completed += sets > 0 and done >= sets
+        day_summaries.append({
+            "day_index": day_index,
+            "part": day.get("part"),
+            "exercises_total": len(exercises),
+            "exercises_completed": exercises_completed,
+            "total_sets": total_sets,
+            "completed_sets": completed_sets,
+            "completion": _ratio(completed_sets, total_sets),
+        })
+
+    total_sets = sum(day["total_sets"] for day in day_summaries)
+    completed_sets = sum(day["completed_sets"] for day in day_summaries)
+    return {
+        "total_sets": total_sets,
+        "completed_sets": completed_sets,
+        "completion": _ratio(completed_sets, total_sets),
+        "days_completed": sum(1 for day in day_summaries if day["total_sets"] and day["completion"] == 1),
+        "days": day_summaries,
+    }
+
+
+def get_progress_summary(db: Session, user_id: int):
+    """Per-day and overall completion of the user's plan, or None without a plan"""
+    version = _get_version(db, user_id)
+    if version[0] is None:
+        invalidate_progress_summary(user_id)
+        return None
+
+    cached = summary_cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    plan = db.query(Plan).filter(Plan.user_id == user_id).first()
+    if plan is None:
+        return None
+    progress = db.query(Progress.day_index, Progress.exercise_id, Progress.sets_completed).filter(
+        Progress.user_id == user_id
+    ).all()
+    summary = build_summary(plan.days, progress)
+    summary_cache.set(user_id, (version, summary))
+    return summary
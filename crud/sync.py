@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from config import SYNC_TOMBSTONE_RETENTION_DAYS
+from crud.exercise import hydrate_plan
+from models.plan import Plan
+from models.progress import Progress
+from models.sync import Tombstone
+from models.water import WaterIntake, WaterIntakeRecord
+
+TOMBSTONE_RETENTION = timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+
+# Rows are stamped when they are written but become visible on commit, so
+# each delta query looks a little further back than the client's token.
+# Clients may see a row twice; applying a change is idempotent.
+COMMIT_LAG = timedelta(seconds=5)
+
+
+def record_tombstone(db: Session, user_id: int, entity: str, key="*"):
+    """Remembers a deletion for delta sync and drops the user's expired tombstones. The caller commits."""
+    now = datetime.utcnow()
+    db.query(Tombstone).filter(
+        Tombstone.user_id == user_id, Tombstone.deleted_at < now - TOMBSTONE_RETENTION
+    ).delete(synchronize_session=False)
+    db.add(Tombstone(user_id=user_id, entity=entity, key=str(key), deleted_at=now))
+
+
+def get_changes(db: Session, user_id: int, since: Optional[datetime]) -> dict:
+    """Rows written and deleted after `since`.
+
+    Without `since`, or when it is older than the tombstone retention, the
+    full state is returned with full_sync set, and the client should replace
+    its local copy.
+    """
+    now = datetime.utcnow()
+    full_sync = since is None or since < now - TOMBSTONE_RETENTION
+    cutoff = None if full_sync else since - COMMIT_LAG
+
+    def changed(query, column):
+        return query if cutoff is None else query.filter(column > cutoff)
+
+    progress = changed(
+        db.query(Progress).filter(Progress.user_id == user_id), Progress.completed_at
+    ).order_by(Progress.day_index, Progress.exercise_id).all()
+    plan = changed(db.query(Plan).filter(Plan.user_id == user_id), Plan.updated_at).first()
+    water_intake = changed(
+        db.query(WaterIntake).filter(WaterIntake.user_id == user_id), WaterIntake.timestamp
+    ).order_by(WaterIntake.date).all()
+    water_records = changed(
+        db.query(WaterIntakeRecord).filter(WaterIntakeRecord.user_id == user_id), WaterIntakeRecord.created_at
+    ).order_by(WaterIntakeRecord.id).all()
+    deleted = [] if full_sync else db.query(Tombstone).filter(
+        Tombstone.user_id == user_id, Tombstone.deleted_at > cutoff
+    ).order_by(Tombstone.deleted_at, Tombstone.id).all()
+
+    return {
+        "token": now,
+        "full_sync": full_sync,
+        "deleted": deleted,
+        "plan": hydrate_plan(db, plan) if plan else None,
+        "progress": progress,
+        "water_intake": water_intake,
+        "water_records": water_records,
+    }
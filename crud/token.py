@@ -0,0 +1,70 @@
+import datetime
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from database.upsert import insert_missing
+from models.user import RevokedToken, RefreshSession
+
+
+def revoke_token(db: Session, jti: str, expires_at: datetime.datetime):
+    """Revokes the token; revoking it again (e.g. two concurrent logouts) is a no-op"""
+    insert_missing(
+        db,
+        RevokedToken,
+        [{"jti": jti, "expires_at": expires_at, "revoked_at": datetime.datetime.utcnow()}],
+        index_elements=["jti"],
+        returning=[RevokedToken.jti],
+    )
+    db.commit()
+
+
+def get_revoked_tokens(db: Session, revoked_since: Optional[datetime.datetime] = None) -> List[RevokedToken]:
+    query = db.query(RevokedToken).filter(RevokedToken.expires_at > datetime.datetime.utcnow())
+    if revoked_since is not None:
+        query = query.filter(RevokedToken.revoked_at >= revoked_since)
+    return query.all()
+
+
+def purge_expired_tokens(db: Session) -> int:
+    now = datetime.datetime.utcnow()
+    deleted = db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete()
+    deleted += db.query(RefreshSession).filter(RefreshSession.expires_at <= now).delete()
+    db.commit()
+    return deleted
+
+
+def create_refresh_session(db: Session, session_id: str, user_id: int, token_id: str, expires_at: datetime.datetime):
+    db.add(RefreshSession(id=session_id, user_id=user_id, token_id=token_id, expires_at=expires_at))
+    db.commit()
+
+
+def rotate_refresh_session(db: Session, session_id: str, user_id: int, token_id: str,
+                           new_token_id: str, expires_at: datetime.datetime) -> bool:
+    """Swaps the session's current refresh token for a new one.
+
+    The update only matches while `token_id` is still the current token, so
+    two requests racing with the same refresh token cannot both succeed.
+    Presenting a token that was already rotated out means it was copied, and
+    the whole session is revoked.
+    """
+    rotated = db.query(RefreshSession).filter(
+        RefreshSession.id == session_id,
+        RefreshSession.user_id == user_id,
+        RefreshSession.token_id == token_id,
+        RefreshSession.expires_at > datetime.datetime.utcnow(),
+    ).update({"token_id": new_token_id, "expires_at": expires_at}, synchronize_session=False)
+
+    if not rotated:
+        db.query(RefreshSession).filter(RefreshSession.id == session_id).delete(synchronize_session=False)
+
+    db.commit()
+    return bool(rotated)
+
+
+def delete_refresh_session(db: Session, session_id: str):
+    db.query(RefreshSession).filter(RefreshSession.id == session_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def delete_user_refresh_sessions(db: Session, user_id: int):
+    db.query(RefreshSession).filter(RefreshSession.user_id == user_id).delete(synchronize_session=False)
+    db.commit()
@@ -1,12 +1,17 @@
 from sqlalchemy.orm import Session
 from models.user import User
-from auth.hashing import get_password_hash
-from auth.hashing import verify_password
-from models.user import BlacklistedToken
+from schemas.user import UserProfileUpdate
+from auth.user_cache import invalidate_user
+from crud.token import delete_user_refresh_sessions
+from crud.plan import delete_user_plan
 import datetime
+import logging
 
-def create_user(db: Session, username: str, email: str, password: str, first_name: str, last_name: str, gender: bool):
-    hashed_password = get_password_hash(password)
+logger = logging.getLogger(__name__)
+
+TRAINING_FIELDS = ("training_program", "training_location", "training_experience")
+
+def create_user(db: Session, username: str, email: str, hashed_password: str, first_name: str, last_name: str, gender: bool):
     db_user = User(
         username=username,
         email=email,
@@ -22,44 +27,22 @@ def create_user(db: Session, username: str, email: str, password: str, first_nam
 def get_user(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
-    if not user:
-        return False
-    if not verify_password(password, user.hashed_password):
-        return False
-    return user
-
-def blacklist_token(db: Session, token: str):
-    existing_token = db.query(BlacklistedToken).filter(BlacklistedToken.token == token).first()
-    if existing_token:
-        return
-
-    db_token = BlacklistedToken(token=token, created_at=datetime.datetime.utcnow())
-    db.add(db_token)
-    db.commit()
-
-def is_token_blacklisted(db: Session, token: str) -> bool:
-    return db.query(BlacklistedToken).filter(BlacklistedToken.token == token).first() is not None
+def get_user_by_id(db: Session, user_id: int):
+    return db.get(User, user_id)
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def update_user_password(db: Session, user: User, new_password: str):
-    user.hashed_password = get_password_hash(new_password)
+def update_user_password(db: Session, user_id: int, hashed_password: str):
+    user = get_user_by_id(db, user_id)
+    user.hashed_password = hashed_password
     db.commit()
     db.refresh(user)
+    delete_user_refresh_sessions(db, user.id)
+    invalidate_user(user.id)
 
 reset_codes = {}
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
-
-def update_user_password(db: Session, user: User, new_password: str):
-    user.hashed_password = get_password_hash(new_password)
-    db.commit()
-    db.refresh(user)
-
 def save_reset_code(db: Session, email: str, code: str):
     reset_codes[email] = {"code": code, "expires_at": datetime.datetime.utcnow() + datetime.timedelta(minutes=10)}
 
@@ -70,21 +53,73 @@ def verify_reset_code(db: Session, email: str, code: str):
             return True
     return False
 
-def update_training_program(db: Session, user: User, training_program: str):
-    user.training_program = training_program
+def _reset_plan_if_changed(db: Session, user: User, field: str, value: str) -> bool:
+    """Drops the user's plan when a training setting it was built for changes"""
+    if getattr(user, field) == value:
+        return False
+    logger.info(f"User {user.id}: {field.replace('_', ' ')} changed from '{getattr(user, field)}' to '{value}'")
+    delete_user_plan(db, user.id)
+    return True
+
+def _update_training_setting(db: Session, user_id: int, field: str, value: str):
+    user = get_user_by_id(db, user_id)
+    if not user:
+        return None
+    _reset_plan_if_changed(db, user, field, value)
+    setattr(user, field, value)
     db.commit()
     db.refresh(user)
+    invalidate_user(user.id)
+    return user
+
+def update_training_program(db: Session, user_id: int, training_program: str):
+    return _update_training_setting(db, user_id, "training_program", training_program)
+
+def update_training_location(db: Session, user_id: int, training_location: str):
+    return _update_training_setting(db, user_id, "training_location", training_location)
+
+def update_training_experience(db: Session, user_id: int, training_experience: str):
+    return _update_training_setting(db, user_id, "training_experience", training_experience)
+
+def update_user_profile(db: Session, user_id: int, user_data: UserProfileUpdate):
+    user = get_user_by_id(db, user_id)
+    if not user:
+        return None
+
+    should_reset_plan = False
+    for field in TRAINING_FIELDS:
+        value = getattr(user_data, field)
+        if value is not None and getattr(user, field) != value:
+            should_reset_plan = True
+            logger.info(f"User {user.id}: {field.replace('_', ' ')} changed from '{getattr(user, field)}' to '{value}'")
+
+    for field, value in user_data.dict().items():
+        if value is not None:
+            setattr(user, field, value)
+
+    if should_reset_plan:
+        logger.info(f"User {user.id}: resetting workout plan due to profile changes")
+        delete_user_plan(db, user.id)
 
-def update_training_location(db: Session, user: User, training_location: str):
-    user.training_location = training_location
     db.commit()
     db.refresh(user)
+    invalidate_user(user.id)
+    return user
 
-def update_training_experience(db: Session, user: User, training_experience: str):
-    user.training_experience = training_experience
+def update_avatar(db: Session, user_id: int, avatar_url):
+    """Sets or clears the avatar and returns the previous avatar url"""
+    user = get_user_by_id(db, user_id)
+    old_avatar_url = user.avatar_url
+    user.avatar_url = avatar_url
     db.commit()
-    db.refresh(user)
+    invalidate_user(user.id)
+    return old_avatar_url
 
-def delete_user(db: Session, user: User):
+def delete_user(db: Session, user_id: int):
+    user = get_user_by_id(db, user_id)
+    if not user:
+        return False
     db.delete(user)
     db.commit()
+    invalidate_user(user_id)
+    return True
@@ -1,8 +1,13 @@
+from collections import defaultdict
 from datetime import datetime
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, case, delete, tuple_, update
+from crud.sync import record_tombstone
+from crud.water_stats import refresh_water_rollups, delete_water_rollups
+from database.upsert import insert_missing, upsert
 from models.water import WaterIntake, WaterIntakeRecord
-from schemas.water import WaterIntakeCreate, WaterIntakeRecordCreate
+from schemas.water import WaterIntakeRecordCreate, WaterSyncRecord
 
 
 def get_daily_water_intake(db: Session, user_id: int, date: str):
@@ -11,42 +16,43 @@ def get_daily_water_intake(db: Session, user_id: int, date: str):
     ).first()
 
 
-def get_water_intake_history(db: Session, user_id: int, limit: int = 30):
-    return db.query(WaterIntake).filter(
-        WaterIntake.user_id == user_id
-    ).order_by(WaterIntake.date.desc()).limit(limit).all()
+def get_water_intake_history(db: Session, user_id: int, limit: int = 30, after: Optional[str] = None):
+    """Daily totals, newest first, starting after the date `after` (keyset on the (user_id, date) index)"""
+    query = db.query(WaterIntake).filter(WaterIntake.user_id == user_id)
+    if after is not None:
+        query = query.filter(WaterIntake.date < after)
+    return query.order_by(WaterIntake.date.desc()).limit(limit).all()
 
 
-def get_daily_water_records(db: Session, user_id: int, date: str):
-    return db.query(WaterIntakeRecord).filter(
+def get_daily_water_records(
+        db: Session, user_id: int, date: str, limit: Optional[int] = None, after: Optional[tuple] = None
+):
+    """The day's records, oldest first, starting after the (timestamp, id) key `after`"""
+    query = db.query(WaterIntakeRecord).filter(
         and_(WaterIntakeRecord.user_id == user_id, WaterIntakeRecord.date == date)
-    ).order_by(WaterIntakeRecord.timestamp.desc()).all()
-
-
-def create_water_intake(db: Session, user_id: int, water_intake: WaterIntakeCreate):
-    # Check if there's already an entry for this date
-    date = water_intake.date
-    db_water_intake = get_daily_water_intake(db, user_id, date)
-
-    if db_water_intake:
-        # Update existing record
-        db_water_intake.amount = water_intake.amount
-        db_water_intake.timestamp = datetime.utcnow()
-    else:
-        # Create new record
-        db_water_intake = WaterIntake(
-            user_id=user_id,
-            date=date,
-            amount=water_intake.amount
-        )
-        db.add(db_water_intake)
+    )
+    if after is not None:
+        query = query.filter(tuple_(WaterIntakeRecord.timestamp, WaterIntakeRecord.id) > after)
+    return query.order_by(WaterIntakeRecord.timestamp, WaterIntakeRecord.id).limit(limit).all()
+
+
+def _upsert_daily_total(db: Session, user_id: int, date: str, amount: float, new_amount):
+    """Creates the day's total as `amount`, or sets an existing one to `new_amount`"""
+    timestamp = datetime.utcnow()
+    return upsert(
+        db,
+        WaterIntake,
+        values={"user_id": user_id, "date": date, "amount": amount, "timestamp": timestamp},
+        index_elements=["user_id", "date"],
+        set_={"amount": new_amount, "timestamp": timestamp},
+    )
 
-    db.commit()
-    db.refresh(db_water_intake)
-    return db_water_intake
 
+def log_water_intake_record(db: Session, user_id: int, date: str, record: WaterIntakeRecordCreate):
+    """Adds a record and increments the day's total in the database, in one transaction.
 
-def add_water_intake_record(db: Session, user_id: int, date: str, record: WaterIntakeRecordCreate):
+    Returns (record, daily total).
+    """
     db_record = WaterIntakeRecord(
         user_id=user_id,
         date=date,
@@ -54,50 +60,109 @@ def add_water_intake_record(db: Session, user_id: int, date: str, record: WaterI
         timestamp=record.timestamp
     )
     db.add(db_record)
+    db.flush()
+    db_water_intake = _upsert_daily_total(db, user_id, date, record.amount, WaterIntake.amount + record.amount)
+    refresh_water_rollups(db, user_id, [date])
     db.commit()
-    db.refresh(db_record)
-    return db_record
+    return db_record, db_water_intake
 
 
-def update_water_intake(db: Session, user_id: int, date: str, amount: float):
-    db_water_intake = get_daily_water_intake(db, user_id, date)
+def remove_water_intake_record(db: Session, record_id: int, user_id: int):
+    """Deletes a record and subtracts it from the day's total (never below 0), in one transaction"""
+    deleted = db.execute(
+        delete(WaterIntakeRecord)
+        .where(WaterIntakeRecord.id == record_id, WaterIntakeRecord.user_id == user_id)
+        .returning(WaterIntakeRecord.date, WaterIntakeRecord.amount),
+        execution_options={"synchronize_session": False},
+    ).first()
+    if deleted is None:
+        return False
+    record_tombstone(db, user_id, "water_record", record_id)
+
+    db.execute(
+        update(WaterIntake)
+        .where(WaterIntake.user_id == user_id, WaterIntake.date == deleted.date)
+        .values(
+            amount=case((WaterIntake.amount > deleted.amount, WaterIntake.amount - deleted.amount), else_=0),
+            timestamp=datetime.utcnow(),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    refresh_water_rollups(db, user_id, [deleted.date])
+    db.commit()
+    return True
+
+
+def sync_water_intake_records(db: Session, user_id: int, records: List[WaterSyncRecord]):
+    """Applies a batch of offline records, possibly spanning several days, in one transaction.
+
+    Records are keyed by their client id and ids that were already applied are
+    skipped, so a batch can safely be replayed. The new records are inserted
+    with one statement and each affected day's total is incremented by their
+    sum. Returns (applied client ids, duplicate client ids, updated totals).
+    """
+    rows = {}
+    for record in records:
+        rows.setdefault(record.client_id, {
+            "user_id": user_id,
+            "date": record.date or record.timestamp.strftime("%Y-%m-%d"),
+            "amount": record.amount,
+            "timestamp": record.timestamp,
+            "client_id": record.client_id,
+        })
+
+    inserted = insert_missing(
+        db,
+        WaterIntakeRecord,
+        list(rows.values()),
+        index_elements=["user_id", "client_id"],
+        returning=[WaterIntakeRecord.client_id, WaterIntakeRecord.date, WaterIntakeRecord.amount],
+    )
+
+    deltas = defaultdict(float)
+    for row in inserted:
+        deltas[row.date] += row.amount
+    totals = [
+        _upsert_daily_total(db, user_id, date, delta, WaterIntake.amount + delta)
+        for date, delta in sorted(deltas.items())
+    ]
+    refresh_water_rollups(db, user_id, deltas)
+    db.commit()
+
+    applied = {row.client_id for row in inserted}
+    return (
+        [client_id for client_id in rows if client_id in applied],
+        [client_id for client_id in rows if client_id not in applied],
+        totals,
+    )
 
-    if db_water_intake:
-        db_water_intake.amount = amount
-        db_water_intake.timestamp = datetime.utcnow()
-    else:
-        db_water_intake = WaterIntake(
-            user_id=user_id,
-            date=date,
-            amount=amount
-        )
-        db.add(db_water_intake)
 
+def set_daily_water_intake(db: Session, user_id: int, date: str, amount: float, records):
+    """Sets the day's total and adds its records in one transaction"""
+    db.add_all([
+        WaterIntakeRecord(user_id=user_id, date=date, amount=record.amount, timestamp=record.timestamp)
+        for record in records
+    ])
+    db_water_intake = _upsert_daily_total(db, user_id, date, amount, amount)
+    refresh_water_rollups(db, user_id, [date])
     db.commit()
-    db.refresh(db_water_intake)
     return db_water_intake
 
 
-def delete_day_records(db: Session, user_id: int, date: str):
+def clear_daily_water_intake(db: Session, user_id: int, date: str):
+    """Deletes the day's records and resets its total to 0 in one transaction"""
     db.query(WaterIntakeRecord).filter(
         and_(WaterIntakeRecord.user_id == user_id, WaterIntakeRecord.date == date)
     ).delete()
+    record_tombstone(db, user_id, "water_day", date)
+    _upsert_daily_total(db, user_id, date, 0, 0)
+    refresh_water_rollups(db, user_id, [date])
     db.commit()
 
 
-def delete_water_intake_record(db: Session, record_id: int, user_id: int):
-    db_record = db.query(WaterIntakeRecord).filter(
-        and_(WaterIntakeRecord.id == record_id, WaterIntakeRecord.user_id == user_id)
-    ).first()
-
-    if db_record:
-        db.delete(db_record)
-        db.commit()
-        return True
-    return False
-
-
 def delete_all_water_data(db: Session, user_id: int):
     db.query(WaterIntakeRecord).filter(WaterIntakeRecord.user_id == user_id).delete()
     db.query(WaterIntake).filter(WaterIntake.user_id == user_id).delete()
+    delete_water_rollups(db, user_id)
+    record_tombstone(db, user_id, "water")
     db.commit()
\ No newline at end of file
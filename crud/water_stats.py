@@ -0,0 +1,219 @@
+from collections import defaultdict
+from datetime import date as date_type, datetime, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy.orm import Session
+from config import WATER_DAILY_GOAL
+from database.upsert import insert_missing, upsert
+from models.water import WaterIntake, WaterIntakeWeekly, WaterIntakeMonthly
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def _parse_date(value: str) -> Optional[date_type]:
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _month_bounds(day: date_type):
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return first, next_month - timedelta(days=1)
+
+
+def _lock_periods(db: Session, user_id: int, weeks: List[str], months: List[str]):
+    """Creates the missing week and month rows and locks all of them (weeks first, each in key order)"""
+    insert_missing(
+        db,
+        WaterIntakeWeekly,
+        [{"user_id": user_id, "week_start": week_start} for week_start in weeks],
+        index_elements=["user_id", "week_start"],
+        returning=[WaterIntakeWeekly.id],
+    )
+    insert_missing(
+        db,
+        WaterIntakeMonthly,
+        [{"user_id": user_id, "month": month} for month in months],
+        index_elements=["user_id", "month"],
+        returning=[WaterIntakeMonthly.id],
+    )
+    db.query(WaterIntakeWeekly.id).filter(
+        WaterIntakeWeekly.user_id == user_id, WaterIntakeWeekly.week_start.in_(weeks)
+    ).order_by(WaterIntakeWeekly.week_start).with_for_update().all()
+    db.query(WaterIntakeMonthly.id).filter(
+        WaterIntakeMonthly.user_id == user_id, WaterIntakeMonthly.month.in_(months)
+    ).order_by(WaterIntakeMonthly.month).with_for_update().all()
+
+
+def refresh_water_rollups(db: Session, user_id: int, dates: Iterable[str]):
+    """Recomputes the weekly and monthly rollups containing `dates`.
+
+    Only the affected periods are rebuilt, from their (at most 31) daily
+    totals, so the cost of a write does not grow with the user's history.
+    The period rows are locked before the totals are read: two writers of
+    different days of the same week would otherwise each read the other's
+    day before it commits and the last upsert would drop one of them. The
+    caller commits.
+    """
+    days = {day for day in map(_parse_date, dates) if day is not None}
+    if not days:
+        return
+
+    weeks = {day - timedelta(days=day.weekday()) for day in days}
+    months = {_month_bounds(day) for day in days}
+    start = min(min(weeks), min(first for first, _ in months))
+    end = max(max(weeks) + timedelta(days=6), max(last for _, last in months))
+    _lock_periods(
+        db, user_id,
+        sorted(week_start.strftime(DATE_FORMAT) for week_start in weeks),
+        sorted(first.strftime("%Y-%m") for first, _ in months),
+    )
+
+    rows = db.query(WaterIntake.date, WaterIntake.amount).filter(
+        WaterIntake.user_id == user_id,
+        WaterIntake.date >= start.strftime(DATE_FORMAT),
+        WaterIntake.date <= end.strftime(DATE_FORMAT),
+    ).all()
+    totals = {}
+    for row in rows:
+        day = _parse_date(row.date)
+        if day is not None and row.amount > 0:
+            totals[day] = row.amount
+
+    for week_start in weeks:
+        values = {"total": 0.0, "days_logged": 0, "goal_days": 0, "goal_mask": 0}
+        for offset in range(7):
+            amount = totals.get(week_start + timedelta(days=offset))
+            if amount is None:
+                continue
+            values["total"] += amount
+            values["days_logged"] += 1
+            if amount >= WATER_DAILY_GOAL:
+                values["goal_days"] += 1
+                values["goal_mask"] |= 1 << offset
+        upsert(
+            db,
+            WaterIntakeWeekly,
+            values={"user_id": user_id, "week_start": week_start.strftime(DATE_FORMAT), **values},
+            index_elements=["user_id", "week_start"],
+            set_=values,
+        )
+
+    for first, last in months:
+        amounts = [amount for day, amount in totals.items() if first <= day <= last]
+        values = {
+            "total": sum(amounts),
+            "days_logged": len(amounts),
+            "goal_days": sum(1 for amount in amounts if amount >= WATER_DAILY_GOAL),
+        }
+        upsert(
+            db,
+            WaterIntakeMonthly,
+            values={"user_id": user_id, "month": first.strftime("%Y-%m"), **values},
+            index_elements=["user_id", "month"],
+            set_=values,
+        )
+
+
+def delete_water_rollups(db: Session, user_id: int):
+    """Deletes all rollups of the user. The caller commits."""
+    db.query(WaterIntakeWeekly).filter(WaterIntakeWeekly.user_id == user_id).delete()
+    db.query(WaterIntakeMonthly).filter(WaterIntakeMonthly.user_id == user_id).delete()
+
+
+def _average(total: float, days_logged: int) -> float:
+    return round(total / days_logged, 2) if days_logged else 0.0
+
+
+def get_weekly_stats(db: Session, user_id: int, limit: int = 12) -> List[dict]:
+    weeks = db.query(WaterIntakeWeekly).filter(
+        WaterIntakeWeekly.user_id == user_id, WaterIntakeWeekly.days_logged > 0
+    ).order_by(WaterIntakeWeekly.week_start.desc()).limit(limit).all()
+    return [
+        {
+            "period": week.week_start,
+            "total": week.total,
+            "days_logged": week.days_logged,
+            "goal_days": week.goal_days,
+            "average": _average(week.total, week.days_logged),
+        }
+        for week in weeks
+    ]
+
+
+def get_monthly_stats(db: Session, user_id: int, limit: int = 12) -> List[dict]:
+    months = db.query(WaterIntakeMonthly).filter(
+        WaterIntakeMonthly.user_id == user_id, WaterIntakeMonthly.days_logged > 0
+    ).order_by(WaterIntakeMonthly.month.desc()).limit(limit).all()
+    return [
+        {
+            "period": month.month,
+            "total": month.total,
+            "days_logged": month.days_logged,
+            "goal_days": month.goal_days,
+            "average": _average(month.total, month.days_logged),
+        }
+        for month in months
+    ]
+
+
+def _goal_days_by_week(db: Session, user_id: int):
+    rows = db.query(WaterIntakeWeekly.week_start, WaterIntakeWeekly.goal_mask).filter(
+        WaterIntakeWeekly.user_id == user_id, WaterIntakeWeekly.goal_mask > 0
+    ).all()
+    masks = defaultdict(int)
+    for row in rows:
+        week_start = _parse_date(row.week_start)
+        if week_start is not None:
+            masks[week_start] = row.goal_mask
+    return masks
+
+
+def _longest_streak(masks) -> int:
+    longest = current = 0
+    previous_week = None
+    for week_start in sorted(masks):
+        if previous_week is not None and week_start - previous_week != timedelta(days=7):
+            current = 0
+        for offset in range(7):
+            if masks[week_start] & (1 << offset):
+                current += 1
+                longest = max(longest, current)
+            else:
+                current = 0
+        previous_week = week_start
+    return longest
+
+
+def _current_streak(masks, today: date_type) -> int:
+    def goal_met(day):
+        return bool(masks.get(day - timedelta(days=day.weekday()), 0) & (1 << day.weekday()))
+
+    # Today still counts as part of the streak while its goal has not been met yet
+    day = today if goal_met(today) else today - timedelta(days=1)
+    streak = 0
+    while goal_met(day):
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
+
+
+def get_water_stats(db: Session, user_id: int, today: date_type) -> dict:
+    """Streaks and all-time totals, computed from the rollups only"""
+    months = db.query(WaterIntakeMonthly).filter(WaterIntakeMonthly.user_id == user_id).all()
+    total = sum(month.total for month in months)
+    days_logged = sum(month.days_logged for month in months)
+    goal_days = sum(month.goal_days for month in months)
+    masks = _goal_days_by_week(db, user_id)
+
+    return {
+        "daily_goal": WATER_DAILY_GOAL,
+        "total_amount": total,
+        "days_logged": days_logged,
+        "goal_days": goal_days,
+        "goal_hit_rate": round(goal_days / days_logged, 4) if days_logged else 0.0,
+        "average": _average(total, days_logged),
+        "current_streak": _current_streak(masks, today),
+        "longest_streak": _longest_streak(masks),
+    }
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from crud.exercise import catalog
+from database.upsert import insert_missing, upsert
+from models.plan import Plan, PlanDay
+from models.progress import Progress
+from models.workout import WorkoutEvent, WorkoutWeeklyBucket, WorkoutMonthlyBucket
+from schemas.progress import ProgressCreate
+
+UNKNOWN_BODY_PART = "other"
+
+
+def lock_workout_month(db: Session, user_id: int, completed_at: datetime):
+    """Creates the user's monthly bucket for `completed_at` if missing and locks it.
+
+    Progress writes take this lock before get_current_sets, so concurrent
+    writes of one user (a retried POST, two devices syncing) read the
+    previous sets and the day's first event one after the other instead of
+    both counting the same sets and session. The caller commits.
+    """
+    month = completed_at.strftime("%Y-%m")
+    insert_missing(
+        db,
+        WorkoutMonthlyBucket,
+        [{"user_id": user_id, "month": month, "sessions": 0, "sets": 0}],
+        index_elements=["user_id", "month"],
+        returning=[WorkoutMonthlyBucket.id],
+    )
+    db.query(WorkoutMonthlyBucket.id).filter(
+        WorkoutMonthlyBucket.user_id == user_id, WorkoutMonthlyBucket.month == month
+    ).with_for_update().one()
+
+
+def get_current_sets(db: Session, user_id: int, keys: List[Tuple[int, str]]) -> Dict[tuple, tuple]:
+    """(day_index, exercise_id) -> (sets_completed, completed_at) of the current progress rows.
+
+    Read under lock_workout_month, before the progress upsert.
+    """
+    rows = db.query(Progress.day_index, Progress.exercise_id, Progress.sets_completed, Progress.completed_at).filter(
+        Progress.user_id == user_id,
+        tuple_(Progress.day_index, Progress.exercise_id).in_(keys),
+    ).all()
+    return {(row.day_index, row.exercise_id): (row.sets_completed, row.completed_at) for row in rows}
+
+
+def _resolve_body_parts(db: Session, user_id: int, entries: List[ProgressCreate]) -> Dict[tuple, str]:
+    """Body part of each entry, taken from the entry, the exercise catalog or the user's plan"""
+    body_parts = {(entry.day_index, entry.exercise_id): entry.body_part for entry in entries if entry.body_part}
+    catalog_entries = catalog.get_many(db, {entry.exercise_id for entry in entries})
+    for entry in entries:
+        body_part = catalog_entries.get(entry.exercise_id, {}).get("bodyPart")
+        if body_part:
+            body_parts.setdefault((entry.day_index, entry.exercise_id), body_part)
+    if len(body_parts) == len(entries):
+        return body_parts
+
+    # Exercises of plans saved before the catalog existed
+    days = [
+        data for (data,) in db.query(PlanDay.data)
+        .join(Plan, Plan.id == PlanDay.plan_id)
+        .filter(Plan.user_id == user_id)
+        .order_by(PlanDay.position)
+    ]
+    for position, day in enumerate(days):
+        for exercise in day.get("exercises") or []:
+            key = (day.get("dayIndex", position), exercise.get("id"))
+            if exercise.get("bodyPart"):
+                body_parts.setdefault(key, exercise["bodyPart"])
+    return body_parts
+
+
+def log_workout_events(db: Session, user_id: int, entries: List[ProgressCreate], previous: Dict[tuple, tuple],
+                       completed_at: datetime):
+    """Appends one event per progress write and updates the weekly and monthly buckets.
+
+    `previous` is the progress state before the write (see get_current_sets),
+    and the month of `completed_at` must be locked (see lock_workout_month).
+    An event records the sets done since the previous write of the same
+    exercise that day, so re-sending a growing count is not counted twice,
+    while re-running a plan day on another day counts again. The caller commits.
+    """
+    day = completed_at.date()
+    deltas = []
+    for entry in entries:
+        sets, previous_at = previous.get((entry.day_index, entry.exercise_id), (0, None))
+        delta = entry.sets_completed - sets if previous_at is not None and previous_at.date() == day \
+            else entry.sets_completed
+        if delta:
+            deltas.append((entry, delta))
+    if not deltas:
+        return
+
+    body_parts = _resolve_body_parts(db, user_id, [entry for entry, _ in deltas])
+    day_start = datetime.combine(day, datetime.min.time())
+    new_session = db.query(WorkoutEvent.id).filter(
+        WorkoutEvent.user_id == user_id,
+        WorkoutEvent.completed_at >= day_start,
+        WorkoutEvent.completed_at < day_start + timedelta(days=1),
+    ).first() is None
+
+    sets_by_body_part = defaultdict(int)
+    for entry, delta in deltas:
+        body_part = body_parts.get((entry.day_index, entry.exercise_id), UNKNOWN_BODY_PART)
+        sets_by_body_part[body_part] += delta
+        db.add(WorkoutEvent(
+            user_id=user_id,
+            day_index=entry.day_index,
+            exercise_id=entry.exercise_id,
+            body_part=body_part,
+            sets=delta,
+            completed_at=completed_at,
+        ))
+
+    week_start = (day - timedelta(days=day.weekday())).isoformat()
+    for body_part, sets in sets_by_body_part.items():
+        upsert(
+            db,
+            WorkoutWeeklyBucket,
+            values={"user_id": user_id, "week_start": week_start, "body_part": body_part, "sets": sets},
+            index_elements=["user_id", "week_start", "body_part"],
+            set_={"sets": WorkoutWeeklyBucket.sets + sets},
+        )
+
+    sets = sum(sets_by_body_part.values())
+    upsert(
+        db,
+        WorkoutMonthlyBucket,
+        values={"user_id": user_id, "month": day.strftime("%Y-%m"), "sessions": int(new_session), "sets": sets},
+        index_elements=["user_id", "month"],
+        set_={
+            "sessions": WorkoutMonthlyBucket.sessions + int(new_session),
+            "sets": WorkoutMonthlyBucket.sets + sets,
+        },
+    )
+
+
+def get_weekly_workout_stats(db: Session, user_id: int, weeks: int = 12) -> List[dict]:
+    """Sets per body part for the last `weeks` weeks that have workouts, newest first"""
+    since = (datetime.utcnow().date() - timedelta(weeks=weeks)).isoformat()
+    buckets = db.query(WorkoutWeeklyBucket).filter(
+        WorkoutWeeklyBucket.user_id == user_id, WorkoutWeeklyBucket.week_start > since
+    ).order_by(WorkoutWeeklyBucket.week_start.desc(), WorkoutWeeklyBucket.body_part).all()
+
+    result = {}
+    for bucket in buckets:
+        week = result.setdefault(bucket.week_start, {"week_start": bucket.week_start, "total_sets": 0, "body_parts": {}})
+        week["total_sets"] += bucket.sets
+        week["body_parts"][bucket.body_part] = bucket.sets
+    return list(result.values())
+
+
+def get_monthly_workout_stats(db: Session, user_id: int, months: int = 12) -> List[dict]:
+    buckets = db.query(WorkoutMonthlyBucket).filter(
+        WorkoutMonthlyBucket.user_id == user_id, WorkoutMonthlyBucket.sessions > 0
+    ).order_by(WorkoutMonthlyBucket.month.desc()).limit(months).all()
+    return [{"month": bucket.month, "sessions": bucket.sessions, "sets": bucket.sets} for bucket in buckets]
@@ -0,0 +1,84 @@
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+from utils import metrics
+
+
+def get_pool_options(is_async: bool = False) -> dict:
+    """Keyword arguments for create_engine / create_async_engine"""
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+class _TimedCheckoutMixin:
+    """Records how long callers wait for a pooled connection.
+
+    Pool events only fire once a connection has been handed out, so the wait
+    is measured around the pool's own checkout.
+    """
+
+    metrics_name = "db"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.inc(f"{self.metrics_name}_checkout_timeouts")
+            raise
+        finally:
+            metrics.observe(f"{self.metrics_name}_checkout_wait", time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Reports pool usage and connection churn of `engine` on /metrics as `name`"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    sync_engine.pool.metrics_name = name
+    churn = {"connects": 0, "closes": 0, "invalidations": 0, "checkouts": 0}
+
+    def counter(key):
+        def listener(*args):
+            churn[key] += 1
+        return listener
+
+    event.listen(sync_engine, "connect", counter("connects"))
+    event.listen(sync_engine, "close", counter("closes"))
+    event.listen(sync_engine, "invalidate", counter("invalidations"))
+    event.listen(sync_engine, "checkout", counter("checkouts"))
+
+    def stats():
+        pool = sync_engine.pool
+        if not isinstance(pool, QueuePool):
+            return dict(churn)
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": DB_MAX_OVERFLOW,
+            **churn,
+        }
+
+    metrics.register_collector(name, stats)
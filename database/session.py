@@ -1,14 +1,153 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from config import DATABASE_URL
+from typing import Optional
 
-engine = create_engine(DATABASE_URL)
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+from config import DATABASE_URL, DB_ASYNC, READ_REPLICA_URL, READ_YOUR_WRITES_SECONDS
+from database.pool import get_pool_options, instrument_engine
+from utils.cache import TTLCache
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: str):
+    """Maps a sync database URL to the matching asyncio driver (asyncpg / aiosqlite)"""
+    url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    query = dict(url.query)
+    if drivername == "postgresql+asyncpg" and "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername=drivername, query=query)
+
+
+engine = create_engine(DATABASE_URL, **get_pool_options())
+instrument_engine(engine, "db_pool")
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+
+def create_request_sessionmaker(url: str, name: str):
+    """Returns (engine, session factory) used to serve requests against `url`"""
+    if DB_ASYNC:
+        async_engine = create_async_engine(get_async_database_url(url), **get_pool_options(is_async=True))
+        instrument_engine(async_engine, f"{name}_async_pool")
+        return async_engine, async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    if url == DATABASE_URL:
+        sync_engine = engine
+    else:
+        sync_engine = create_engine(url, **get_pool_options())
+        instrument_engine(sync_engine, f"{name}_pool")
+    # Like the async sessions, request sessions keep loaded rows after commit so
+    # that rows returned by a write are serialized without a refresh query.
+    return sync_engine, sessionmaker(bind=sync_engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+
+request_engine, RequestSessionLocal = create_request_sessionmaker(DATABASE_URL, "db")
+
+# Optional read replica for GET endpoints. For local testing point
+# READ_REPLICA_URL at a copy of the primary SQLite file.
+read_engine, ReadSessionLocal = (
+    create_request_sessionmaker(READ_REPLICA_URL, "db_replica") if READ_REPLICA_URL else (None, None)
+)
+
+# Users who committed a write recently read from the primary until the
+# replica has had time to catch up (read-your-writes).
+primary_pins = TTLCache(max_size=100000, ttl_seconds=READ_YOUR_WRITES_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed(session):
+    session.info["committed"] = True
+
+
+class Database:
+    """Request-scoped database handle.
+
+    Crud functions stay plain functions taking a Session. `run` executes one
+    natively on the event loop through an AsyncSession when DB_ASYNC is on,
+    or in the threadpool with a regular Session otherwise. The session is
+    opened on first use, so a request served from caches never checks out a
+    connection.
+    """
+
+    def __init__(self, session_factory, request: Optional[Request] = None):
+        self._session_factory = session_factory
+        self._session = None
+        self._request = request
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    async def run(self, func, *args, **kwargs):
+        session = self.session
+        if isinstance(session, AsyncSession):
+            result = await session.run_sync(lambda sync_session: func(sync_session, *args, **kwargs))
+            info = session.sync_session.info
+        else:
+            result = await run_in_threadpool(func, session, *args, **kwargs)
+            info = session.info
+
+        if info.pop("committed", False) and self._request is not None:
+            user_id = getattr(self._request.state, "user_id", None)
+            if user_id is not None:
+                primary_pins.set(user_id, True)
+        return result
+
+    async def close(self):
+        if self._session is None:
+            return
+        if isinstance(self._session, AsyncSession):
+            await self._session.close()
+        else:
+            await run_in_threadpool(self._session.close)
+
+
+async def get_db(request: Request):
+    db = Database(RequestSessionLocal, request)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_read_db(request: Request):
+    """Like get_db, but served by the read replica when one is configured.
+
+    The replica is chosen when the session is first used, i.e. after
+    get_current_user has identified the user, so users who wrote within the
+    last READ_YOUR_WRITES_SECONDS keep reading from the primary.
+    """
+
+    def session_factory():
+        user_id = getattr(request.state, "user_id", None)
+        if ReadSessionLocal is None or (user_id is not None and user_id in primary_pins):
+            return RequestSessionLocal()
+        return ReadSessionLocal()
+
+    db = Database(session_factory, request)
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+
+
+async def dispose_engines():
+    if DB_ASYNC:
+        await request_engine.dispose()
+        if read_engine is not None:
+            await read_engine.dispose()
+    elif read_engine is not None:
+        read_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,65 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    insert = _INSERTS.get(dialect)
+    if insert is None:
+        raise NotImplementedError(f"Upserts are not supported for the {dialect} dialect")
+    return insert
+
+
+def upsert(db: Session, model, values: dict, index_elements: list, set_: dict):
+    """INSERT ... ON CONFLICT (index_elements) DO UPDATE SET ... RETURNING *
+
+    Inserts `values` as a new `model` row or, when a row with the same key
+    already exists, applies `set_` to it. Values in `set_` may be SQL
+    expressions on the existing row (e.g. `Model.amount + delta`). Returns the
+    resulting ORM object in a single round trip; the caller commits.
+    """
+    stmt = (
+        _insert(db)(model)
+        .values(**values)
+        .on_conflict_do_update(index_elements=index_elements, set_=set_)
+        .returning(model)
+    )
+    return db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
+
+def upsert_many(db: Session, model, rows: list, index_elements: list, update_columns: list):
+    """Multi-row upsert: rows whose key exists get `update_columns` from the proposed row.
+
+    Keys must be unique within `rows`. Returns the resulting ORM objects (in
+    no particular order) from a single statement; the caller commits.
+    """
+    if not rows:
+        return []
+    stmt = _insert(db)(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns},
+    ).returning(model)
+    return db.scalars(stmt, execution_options={"populate_existing": True}).all()
+
+
+def insert_missing(db: Session, model, rows: list, index_elements: list, returning: list):
+    """Multi-row INSERT ... ON CONFLICT (index_elements) DO NOTHING RETURNING ...
+
+    Rows whose key already exists are skipped; only the inserted rows are
+    returned. The caller commits.
+    """
+    if not rows:
+        return []
+    stmt = (
+        _insert(db)(model.__table__)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=index_elements)
+        .returning(*returning)
+    )
+    return db.execute(stmt).all()
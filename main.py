@@ -1,7 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from database.session import Base, engine
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from database.session import Base, SessionLocal, engine, dispose_engines
+from config import DB_CREATE_ALL
+from auth.hashing import start_password_pool, shutdown_password_pool
+from utils.rate_limit import init_rate_limiter, close_rate_limiter
+from utils.pagination import NEXT_CURSOR_HEADER
+from crud.exercise_search import exercise_search
+from starlette.concurrency import run_in_threadpool
 import logging
 import os
 
@@ -12,6 +21,9 @@ from routers.progress import router as progress_router
 from routers.plan import router as plan_router
 from routers.water import router as water_router
 from routers.email_verification import router as email_verification_router
+from routers.metrics import router as metrics_router
+from routers.sync import router as sync_router
+from routers.exercises import router as exercises_router
 
 
 app = FastAPI()
@@ -34,6 +46,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
 if not os.path.exists("media"):
@@ -42,11 +55,57 @@ if not os.path.exists("media"):
 if not os.path.exists("static/assets/gifs"):
     os.makedirs("static/assets/gifs")
 
+def _build_exercise_search():
+    try:
+        with SessionLocal() as db:
+            exercise_search.refresh(db)
+    except Exception as e:
+        logger.warning(f"Exercise search index not built at startup: {str(e)}")
+        return
+    if not exercise_search.stats()["documents"]:
+        logger.warning(
+            "The exercise catalog is empty; import it with `python -m scripts.import_exercises <file.json>`"
+        )
+
+
+@app.on_event("startup")
+async def startup():
+    start_password_pool()
+    await init_rate_limiter()
+    await run_in_threadpool(_build_exercise_search)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    shutdown_password_pool()
+    await close_rate_limiter()
+    await dispose_engines()
+
+
 app.mount("/media", StaticFiles(directory="media"), name="media")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
-Base.metadata.create_all(bind=engine)
+def _create_schema():
+    """Creates the tables of an empty database and marks it as migrated to head.
+
+    A database that already has tables is left to `alembic upgrade head`:
+    create_all only adds missing tables, next to outdated ones.
+    """
+    if inspect(engine).get_table_names():
+        logger.warning("DB_CREATE_ALL ignored: the database is not empty, run `alembic upgrade head` instead")
+        return
+    Base.metadata.create_all(bind=engine)
+    # No config file, so that env.py leaves the app's logging alone
+    alembic_config = Config()
+    migrations = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+    alembic_config.set_main_option("script_location", migrations)
+    command.stamp(alembic_config, "head")
+    logger.info("Created the database schema and stamped it at the latest migration")
+
+
+if DB_CREATE_ALL:
+    _create_schema()
 
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(users_router, prefix="/users", tags=["Users"])
@@ -55,3 +114,6 @@ app.include_router(progress_router, prefix="/progress", tags=["Progress"])
 app.include_router(plan_router, prefix="/plan", tags=["Plan"])
 app.include_router(water_router, prefix="/water", tags=["Water Tracking"])
 app.include_router(email_verification_router, prefix="/auth", tags=["Email Verification"])
+app.include_router(sync_router, prefix="/sync", tags=["Sync"])
+app.include_router(exercises_router, prefix="/exercises", tags=["Exercises"])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
@@ -0,0 +1,117 @@
+"""baseline schema as created by Base.metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases that were bootstrapped by create_all already have these tables;
+they are skipped, so `alembic upgrade head` works on both fresh and existing
+installs without a manual `alembic stamp`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String()),
+            sa.Column("email", sa.String()),
+            sa.Column("hashed_password", sa.String()),
+            sa.Column("first_name", sa.String(), nullable=False),
+            sa.Column("last_name", sa.String(), nullable=False),
+            sa.Column("gender", sa.Boolean(), nullable=False),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("role", sa.String()),
+            sa.Column("weight", sa.Float()),
+            sa.Column("height", sa.Float()),
+            sa.Column("age", sa.Integer()),
+            sa.Column("training_program", sa.String()),
+            sa.Column("training_location", sa.String()),
+            sa.Column("training_experience", sa.String()),
+            sa.Column("avatar_url", sa.String()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "blacklisted_tokens" not in existing:
+        op.create_table(
+            "blacklisted_tokens",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("token", sa.String()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_blacklisted_tokens_id", "blacklisted_tokens", ["id"])
+        op.create_index("ix_blacklisted_tokens_token", "blacklisted_tokens", ["token"], unique=True)
+
+    if "training_plans" not in existing:
+        op.create_table(
+            "training_plans",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("start_date", sa.DateTime(), nullable=False),
+            sa.Column("days", sa.JSON(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_training_plans_id", "training_plans", ["id"])
+
+    if "training_progress" not in existing:
+        op.create_table(
+            "training_progress",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("day_index", sa.Integer(), nullable=False),
+            sa.Column("exercise_id", sa.String(), nullable=False),
+            sa.Column("sets_completed", sa.Integer(), nullable=False),
+            sa.Column("completed_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_training_progress_id", "training_progress", ["id"])
+
+    for table in ("water_intake", "water_intake_records"):
+        if table not in existing:
+            op.create_table(
+                table,
+                sa.Column("id", sa.Integer(), primary_key=True),
+                sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+                sa.Column("amount", sa.Float(), nullable=False),
+                sa.Column("date", sa.String(), nullable=False),
+                sa.Column("timestamp", sa.DateTime(), nullable=False),
+            )
+            op.create_index(f"ix_{table}_id", table, ["id"])
+
+    if "email_verification_codes" not in existing:
+        op.create_table(
+            "email_verification_codes",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("code", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("is_used", sa.Boolean()),
+        )
+        op.create_index("ix_email_verification_codes_id", "email_verification_codes", ["id"])
+        op.create_index("ix_email_verification_codes_email", "email_verification_codes", ["email"])
+
+
+def downgrade():
+    for table in (
+        "email_verification_codes",
+        "water_intake_records",
+        "water_intake",
+        "training_progress",
+        "training_plans",
+        "blacklisted_tokens",
+        "users",
+    ):
+        op.drop_table(table)
@@ -0,0 +1,130 @@
+"""token tables, unique keys and composite indexes for hot queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+import hashlib
+from datetime import datetime
+
+from alembic import op
+from jose import JWTError, jwt
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns, unique)
+INDEXES = [
+    ("training_plans", "uq_training_plans_user_id", ["user_id"], True),
+    ("training_progress", "uq_training_progress_user_day_exercise", ["user_id", "day_index", "exercise_id"], True),
+    ("water_intake", "uq_water_intake_user_date", ["user_id", "date"], True),
+    ("water_intake_records", "ix_water_intake_records_user_date_timestamp", ["user_id", "date", "timestamp"], False),
+    ("email_verification_codes", "ix_email_verification_codes_email_created_at", ["email", "created_at"], False),
+]
+
+
+def _token_id(token, claims):
+    """Frozen copy of auth.jwt.get_token_id at the time of this migration"""
+    return claims.get("jti") or hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+def _carry_over_blacklist(bind):
+    """Revokes the blacklisted tokens that have not expired yet under their new id"""
+    now = datetime.utcnow()
+    existing = {jti for (jti,) in bind.execute(sa.text("SELECT jti FROM revoked_tokens"))}
+    rows = {}
+    blacklisted_tokens = sa.table(
+        "blacklisted_tokens", sa.column("token", sa.String()), sa.column("created_at", sa.DateTime())
+    )
+    for token, created_at in bind.execute(sa.select(blacklisted_tokens.c.token, blacklisted_tokens.c.created_at)):
+        try:
+            # The signature was checked at logout; only the id and expiry are needed here
+            claims = jwt.get_unverified_claims(token)
+        except (JWTError, AttributeError):
+            continue
+        expires_at = datetime.utcfromtimestamp(claims["exp"]) if "exp" in claims else datetime.max
+        jti = _token_id(token, claims)
+        if expires_at > now and jti not in existing:
+            rows[jti] = {"jti": jti, "expires_at": expires_at, "revoked_at": created_at or now}
+
+    revoked_tokens = sa.table(
+        "revoked_tokens",
+        sa.column("jti", sa.String()),
+        sa.column("expires_at", sa.DateTime()),
+        sa.column("revoked_at", sa.DateTime()),
+    )
+    if rows:
+        op.bulk_insert(revoked_tokens, list(rows.values()))
+
+
+def _dedupe(table, columns):
+    """Keeps the newest row per key so the unique index can be created"""
+    key = ", ".join(columns)
+    op.execute(
+        f"DELETE FROM {table} WHERE id NOT IN "
+        f"(SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM {table} GROUP BY {key}) AS keep)"
+    )
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+
+    if "revoked_tokens" not in existing:
+        op.create_table(
+            "revoked_tokens",
+            sa.Column("jti", sa.String(64), primary_key=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("revoked_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+        op.create_index("ix_revoked_tokens_revoked_at", "revoked_tokens", ["revoked_at"])
+
+    if "refresh_sessions" not in existing:
+        op.create_table(
+            "refresh_sessions",
+            sa.Column("id", sa.String(32), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("token_id", sa.String(32), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_refresh_sessions_user_id", "refresh_sessions", ["user_id"])
+        op.create_index("ix_refresh_sessions_expires_at", "refresh_sessions", ["expires_at"])
+
+    if "blacklisted_tokens" in existing:
+        _carry_over_blacklist(op.get_bind())
+        op.drop_table("blacklisted_tokens")
+
+    for table, name, columns, unique in INDEXES:
+        if name in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+        if unique:
+            _dedupe(table, columns)
+        op.create_index(name, table, columns, unique=unique)
+
+    if "ix_email_verification_codes_email" in {
+        index["name"] for index in inspector.get_indexes("email_verification_codes")
+    }:
+        op.drop_index("ix_email_verification_codes_email", table_name="email_verification_codes")
+
+
+def downgrade():
+    op.create_index("ix_email_verification_codes_email", "email_verification_codes", ["email"])
+    for table, name, columns, unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+
+    op.create_table(
+        "blacklisted_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("token", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_blacklisted_tokens_id", "blacklisted_tokens", ["id"])
+    op.create_index("ix_blacklisted_tokens_token", "blacklisted_tokens", ["token"], unique=True)
+    op.drop_table("refresh_sessions")
+    op.drop_table("revoked_tokens")
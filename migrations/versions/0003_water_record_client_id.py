@@ -0,0 +1,35 @@
+"""client ids on water intake records for idempotent offline sync
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "client_id" not in {column["name"] for column in inspector.get_columns("water_intake_records")}:
+        op.add_column("water_intake_records", sa.Column("client_id", sa.String(64), nullable=True))
+    if "uq_water_intake_records_user_client_id" not in {
+        index["name"] for index in inspector.get_indexes("water_intake_records")
+    }:
+        op.create_index(
+            "uq_water_intake_records_user_client_id",
+            "water_intake_records",
+            ["user_id", "client_id"],
+            unique=True,
+        )
+
+
+def downgrade():
+    op.drop_index("uq_water_intake_records_user_client_id", table_name="water_intake_records")
+    with op.batch_alter_table("water_intake_records") as batch_op:
+        batch_op.drop_column("client_id")
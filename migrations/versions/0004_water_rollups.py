@@ -0,0 +1,99 @@
+"""weekly and monthly water intake rollups
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import WATER_DAILY_GOAL
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _rollup_columns():
+    return [
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("days_logged", sa.Integer(), nullable=False),
+        sa.Column("goal_days", sa.Integer(), nullable=False),
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+
+    if "water_intake_weekly" in existing:
+        weekly = sa.Table("water_intake_weekly", sa.MetaData(), autoload_with=bind)
+    else:
+        weekly = op.create_table(
+            "water_intake_weekly",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("week_start", sa.String(), nullable=False),
+            *_rollup_columns(),
+            sa.Column("goal_mask", sa.Integer(), nullable=False),
+        )
+        op.create_index(
+            "uq_water_intake_weekly_user_week", "water_intake_weekly", ["user_id", "week_start"], unique=True
+        )
+
+    if "water_intake_monthly" in existing:
+        monthly = sa.Table("water_intake_monthly", sa.MetaData(), autoload_with=bind)
+    else:
+        monthly = op.create_table(
+            "water_intake_monthly",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("month", sa.String(), nullable=False),
+            *_rollup_columns(),
+        )
+        op.create_index(
+            "uq_water_intake_monthly_user_month", "water_intake_monthly", ["user_id", "month"], unique=True
+        )
+
+    # Tables created by create_all next to an older schema are still empty
+    for table in (weekly, monthly):
+        if bind.execute(sa.select(table.c.id).limit(1)).first() is not None:
+            return
+
+    # Backfill from the existing daily totals
+    weeks = defaultdict(lambda: {"total": 0.0, "days_logged": 0, "goal_days": 0, "goal_mask": 0})
+    months = defaultdict(lambda: {"total": 0.0, "days_logged": 0, "goal_days": 0})
+    rows = bind.execute(sa.text("SELECT user_id, date, amount FROM water_intake WHERE amount > 0"))
+    for user_id, date, amount in rows:
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            continue
+        goal_met = amount >= WATER_DAILY_GOAL
+        week = weeks[(user_id, (day - timedelta(days=day.weekday())).strftime("%Y-%m-%d"))]
+        month = months[(user_id, day.strftime("%Y-%m"))]
+        for rollup in (week, month):
+            rollup["total"] += amount
+            rollup["days_logged"] += 1
+            rollup["goal_days"] += goal_met
+        if goal_met:
+            week["goal_mask"] |= 1 << day.weekday()
+
+    op.bulk_insert(weekly, [
+        {"user_id": user_id, "week_start": week_start, **values}
+        for (user_id, week_start), values in weeks.items()
+    ])
+    op.bulk_insert(monthly, [
+        {"user_id": user_id, "month": month, **values}
+        for (user_id, month), values in months.items()
+    ])
+
+
+def downgrade():
+    op.drop_table("water_intake_monthly")
+    op.drop_table("water_intake_weekly")
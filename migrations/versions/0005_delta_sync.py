@@ -0,0 +1,56 @@
+"""tombstones, record creation time and indexes for delta sync
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+# (table, index name, columns)
+INDEXES = [
+    ("water_intake_records", "ix_water_intake_records_user_created_at", ["user_id", "created_at"]),
+    ("water_intake", "ix_water_intake_user_timestamp", ["user_id", "timestamp"]),
+    ("training_progress", "ix_training_progress_user_completed_at", ["user_id", "completed_at"]),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "tombstones" not in inspector.get_table_names():
+        op.create_table(
+            "tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("entity", sa.String(32), nullable=False),
+            sa.Column("key", sa.String(64), nullable=False),
+            sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_tombstones_user_deleted_at", "tombstones", ["user_id", "deleted_at"])
+
+    # Existing records were created when they were logged
+    if "created_at" not in {column["name"] for column in inspector.get_columns("water_intake_records")}:
+        op.add_column("water_intake_records", sa.Column("created_at", sa.DateTime(), nullable=True))
+        op.execute("UPDATE water_intake_records SET created_at = timestamp")
+        with op.batch_alter_table("water_intake_records") as batch_op:
+            batch_op.alter_column("created_at", existing_type=sa.DateTime(), nullable=False)
+
+    for table, name, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table("water_intake_records") as batch_op:
+        batch_op.drop_column("created_at")
+    op.drop_table("tombstones")
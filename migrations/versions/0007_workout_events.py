@@ -0,0 +1,138 @@
+"""append-only workout events with weekly and monthly buckets
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def _as_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _table(bind, existing, name, *columns):
+    """The table `name`, created with `columns` unless create_all already did"""
+    if name in existing:
+        return sa.Table(name, sa.MetaData(), autoload_with=bind)
+    return op.create_table(name, *columns)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = set(inspector.get_table_names())
+
+    events = _table(
+        bind, existing, "workout_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("day_index", sa.Integer(), nullable=False),
+        sa.Column("exercise_id", sa.String(), nullable=False),
+        sa.Column("body_part", sa.String(), nullable=False),
+        sa.Column("sets", sa.Integer(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=False),
+    )
+    weekly = _table(
+        bind, existing, "workout_weekly_buckets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("week_start", sa.String(), nullable=False),
+        sa.Column("body_part", sa.String(), nullable=False),
+        sa.Column("sets", sa.Integer(), nullable=False),
+    )
+    monthly = _table(
+        bind, existing, "workout_monthly_buckets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("month", sa.String(), nullable=False),
+        sa.Column("sessions", sa.Integer(), nullable=False),
+        sa.Column("sets", sa.Integer(), nullable=False),
+    )
+
+    # (table, index name, columns, unique)
+    for table, name, columns, unique in [
+        ("workout_events", "ix_workout_events_user_completed_at", ["user_id", "completed_at"], False),
+        ("workout_weekly_buckets", "uq_workout_weekly_buckets_user_week_body_part",
+         ["user_id", "week_start", "body_part"], True),
+        ("workout_monthly_buckets", "uq_workout_monthly_buckets_user_month", ["user_id", "month"], True),
+    ]:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=unique)
+
+    # Tables created by create_all may already be in use
+    for table in (events, weekly, monthly):
+        if bind.execute(sa.select(table.c.id).limit(1)).first() is not None:
+            return
+
+    # Seed the log with the current progress rows, the only history there is
+    if "days" in {column["name"] for column in inspector.get_columns("training_plans")}:
+        plans = bind.execute(sa.text("SELECT user_id, days FROM training_plans")).all()
+    else:
+        # A schema from create_all keeps the days in training_plan_days
+        plans = defaultdict(list)
+        for user_id, data in bind.execute(sa.text(
+            "SELECT p.user_id, d.data FROM training_plan_days d JOIN training_plans p ON p.id = d.plan_id "
+            "ORDER BY d.plan_id, d.position"
+        )):
+            plans[user_id].append(json.loads(data) if isinstance(data, str) else data)
+        plans = plans.items()
+
+    body_parts = {}
+    for user_id, days in plans:
+        days = json.loads(days) if isinstance(days, str) else days or []
+        for position, day in enumerate(days):
+            for exercise in day.get("exercises") or []:
+                if exercise.get("bodyPart"):
+                    body_parts[(user_id, day.get("dayIndex", position), exercise.get("id"))] = exercise["bodyPart"]
+
+    event_rows = []
+    weeks = defaultdict(int)
+    months = defaultdict(lambda: {"sessions": set(), "sets": 0})
+    progress = bind.execute(sa.text(
+        "SELECT user_id, day_index, exercise_id, sets_completed, completed_at "
+        "FROM training_progress WHERE sets_completed > 0"
+    ))
+    for user_id, day_index, exercise_id, sets, completed_at in progress:
+        completed_at = _as_datetime(completed_at)
+        day = completed_at.date()
+        body_part = body_parts.get((user_id, day_index, exercise_id), "other")
+        event_rows.append({
+            "user_id": user_id,
+            "day_index": day_index,
+            "exercise_id": exercise_id,
+            "body_part": body_part,
+            "sets": sets,
+            "completed_at": completed_at,
+        })
+        weeks[(user_id, (day - timedelta(days=day.weekday())).isoformat(), body_part)] += sets
+        month = months[(user_id, day.strftime("%Y-%m"))]
+        month["sessions"].add(day)
+        month["sets"] += sets
+
+    op.bulk_insert(events, event_rows)
+    op.bulk_insert(weekly, [
+        {"user_id": user_id, "week_start": week_start, "body_part": body_part, "sets": sets}
+        for (user_id, week_start, body_part), sets in weeks.items()
+    ])
+    op.bulk_insert(monthly, [
+        {"user_id": user_id, "month": month, "sessions": len(values["sessions"]), "sets": values["sets"]}
+        for (user_id, month), values in months.items()
+    ])
+
+
+def downgrade():
+    op.drop_table("workout_monthly_buckets")
+    op.drop_table("workout_weekly_buckets")
+    op.drop_table("workout_events")
@@ -0,0 +1,66 @@
+"""exercise catalog, plans keep only per-user exercise fields
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+The catalog starts empty and is filled from trusted data with
+`python -m scripts.import_exercises`, never from user plans. Existing plans
+are left as they are; they are compacted against the catalog the next time
+they are saved.
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of crud.exercise.COMPACTED_FIELDS_KEY at the time of this migration
+COMPACTED_FIELDS_KEY = "_catalog"
+
+
+def _load(days):
+    return json.loads(days) if isinstance(days, str) else days or []
+
+
+def upgrade():
+    if "exercises" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "exercises",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("body_part", sa.String(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_exercises_body_part", "exercises", ["body_part"])
+
+
+def downgrade():
+    # Put the catalog fields that compaction dropped back into the plans before dropping the catalog
+    bind = op.get_bind()
+    catalog = {
+        exercise_id: data if isinstance(data, dict) else json.loads(data)
+        for exercise_id, data in bind.execute(sa.text("SELECT id, data FROM exercises"))
+    }
+    plans_table = sa.table("training_plans", sa.column("id", sa.Integer()), sa.column("days", sa.JSON()))
+    for plan_id, days in bind.execute(sa.text("SELECT id, days FROM training_plans")).all():
+        hydrated = []
+        for day in _load(days):
+            exercises = []
+            for exercise in day.get("exercises") or []:
+                entry = catalog.get(str(exercise.get("id")), {})
+                exercises.append({
+                    **{field: entry[field] for field in exercise.get(COMPACTED_FIELDS_KEY) or () if field in entry},
+                    **{key: value for key, value in exercise.items() if key != COMPACTED_FIELDS_KEY},
+                })
+            hydrated.append({**day, "exercises": exercises})
+        bind.execute(plans_table.update().where(plans_table.c.id == plan_id).values(days=hydrated))
+    op.drop_table("exercises")
@@ -0,0 +1,77 @@
+"""store plan days one row each
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def _load(days):
+    return json.loads(days) if isinstance(days, str) else days or []
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "training_plan_days" in inspector.get_table_names():
+        plan_days = sa.Table("training_plan_days", sa.MetaData(), autoload_with=bind)
+    else:
+        plan_days = op.create_table(
+            "training_plan_days",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "plan_id", sa.Integer(), sa.ForeignKey("training_plans.id", ondelete="CASCADE"), nullable=False
+            ),
+            sa.Column("position", sa.Integer(), nullable=False),
+            sa.Column("day_index", sa.Integer(), nullable=False),
+            sa.Column("data", sa.JSON(), nullable=False),
+        )
+        op.create_index(
+            "uq_training_plan_days_plan_position", "training_plan_days", ["plan_id", "position"], unique=True
+        )
+    if "days" not in {column["name"] for column in inspector.get_columns("training_plans")}:
+        return
+
+    # Plans that already have day rows were saved by the new code next to the old column
+    copied = {plan_id for (plan_id,) in bind.execute(sa.text("SELECT DISTINCT plan_id FROM training_plan_days"))}
+    rows = []
+    for plan_id, days in bind.execute(sa.text("SELECT id, days FROM training_plans")).all():
+        if plan_id in copied:
+            continue
+        for position, day in enumerate(_load(days)):
+            rows.append({"plan_id": plan_id, "position": position, "day_index": day.get("dayIndex", position), "data": day})
+    if rows:
+        op.bulk_insert(plan_days, rows)
+
+    with op.batch_alter_table("training_plans") as batch_op:
+        batch_op.drop_column("days")
+
+
+def downgrade():
+    with op.batch_alter_table("training_plans") as batch_op:
+        batch_op.add_column(sa.Column("days", sa.JSON(), nullable=True))
+
+    bind = op.get_bind()
+    days = {}
+    for plan_id, data in bind.execute(
+        sa.text("SELECT plan_id, data FROM training_plan_days ORDER BY plan_id, position")
+    ):
+        days.setdefault(plan_id, []).append(data if isinstance(data, dict) else json.loads(data))
+
+    plans = sa.table("training_plans", sa.column("id", sa.Integer()), sa.column("days", sa.JSON()))
+    for (plan_id,) in bind.execute(sa.text("SELECT id FROM training_plans")).all():
+        bind.execute(plans.update().where(plans.c.id == plan_id).values(days=days.get(plan_id, [])))
+
+    with op.batch_alter_table("training_plans") as batch_op:
+        batch_op.alter_column("days", existing_type=sa.JSON(), nullable=False)
+    op.drop_table("training_plan_days")
@@ -1,12 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from datetime import datetime
 from database.session import Base
 
 class EmailVerificationCode(Base):
     __tablename__ = "email_verification_codes"
+    __table_args__ = (
+        Index("ix_email_verification_codes_email_created_at", "email", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, index=True, nullable=False)
+    email = Column(String, nullable=False)
     code = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_used = Column(Boolean, default=False)
@@ -0,0 +1,14 @@
+import datetime
+from sqlalchemy import Column, String, DateTime, JSON
+from database.session import Base
+
+
+class Exercise(Base):
+    """Shared exercise catalog; plans only keep the per-user fields of an exercise"""
+    __tablename__ = "exercises"
+
+    id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    body_part = Column(String, nullable=True, index=True)
+    data = Column(JSON, nullable=False)  # Catalog fields in the plan payload shape (name, bodyPart, gifUrl, ...)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
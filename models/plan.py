@@ -1,22 +1,61 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from database.session import Base
 import datetime
 
 class Plan(Base):
     __tablename__ = "training_plans"
+    __table_args__ = (
+        Index("uq_training_plans_user_id", "user_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     start_date = Column(DateTime, nullable=False)
-    days = Column(JSON, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
     user = relationship("User", back_populates="plan")
+    day_rows = relationship(
+        "PlanDay", back_populates="plan", order_by="PlanDay.position",
+        cascade="all, delete-orphan", lazy="selectin",
+    )
+
+    @property
+    def days(self):
+        return [row.data for row in self.day_rows]
+
+    @days.setter
+    def days(self, days):
+        """Stores the days one row each; only rows whose day changed are written"""
+        rows = self.day_rows
+        for position, day in enumerate(days):
+            if position < len(rows):
+                if rows[position].data != day:
+                    rows[position].day_index = day.get("dayIndex", position)
+                    rows[position].data = day
+            else:
+                rows.append(PlanDay(position=position, day_index=day.get("dayIndex", position), data=day))
+        del rows[len(days):]
 
     def to_dict(self):
         return {
             "start_date": self.start_date.isoformat(),
             "days": self.days  # Return as is since it's already in the correct format
-        }
\ No newline at end of file
+        }
+
+
+class PlanDay(Base):
+    """One day of a plan, so that editing a day does not rewrite the others"""
+    __tablename__ = "training_plan_days"
+    __table_args__ = (
+        Index("uq_training_plan_days_plan_position", "plan_id", "position", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    plan_id = Column(Integer, ForeignKey("training_plans.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # Order of the day in the plan
+    day_index = Column(Integer, nullable=False)  # The day's dayIndex, used to address it
+    data = Column(JSON, nullable=False)  # dayIndex, part, exercises and any extra fields
+
+    plan = relationship("Plan", back_populates="day_rows")
@@ -1,10 +1,14 @@
 import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database.session import Base
 
 class Progress(Base):
     __tablename__ = "training_progress"
+    __table_args__ = (
+        Index("uq_training_progress_user_day_exercise", "user_id", "day_index", "exercise_id", unique=True),
+        Index("ix_training_progress_user_completed_at", "user_id", "completed_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,20 @@
+import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from database.session import Base
+
+
+class Tombstone(Base):
+    """Records a deletion so that delta sync can report it to other devices"""
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_user_deleted_at", "user_id", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String(32), nullable=False)  # progress, plan, water, water_day or water_record
+    key = Column(String(64), nullable=False, default="*")  # "*" for all rows of the entity
+    deleted_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    user = relationship("User", back_populates="tombstones")
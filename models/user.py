@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey
 from sqlalchemy.orm import relationship
 from database.session import Base
 import datetime
@@ -25,11 +25,32 @@ class User(Base):
     plan = relationship("Plan", back_populates="user", uselist=False, cascade="all, delete-orphan")
     water_intake = relationship("WaterIntake", back_populates="user", cascade="all, delete-orphan")
     water_intake_records = relationship("WaterIntakeRecord", back_populates="user", cascade="all, delete-orphan")
+    water_intake_weekly = relationship("WaterIntakeWeekly", back_populates="user", cascade="all, delete-orphan")
+    water_intake_monthly = relationship("WaterIntakeMonthly", back_populates="user", cascade="all, delete-orphan")
+    workout_events = relationship("WorkoutEvent", back_populates="user", cascade="all, delete-orphan")
+    workout_weekly_buckets = relationship("WorkoutWeeklyBucket", back_populates="user", cascade="all, delete-orphan")
+    workout_monthly_buckets = relationship("WorkoutMonthlyBucket", back_populates="user", cascade="all, delete-orphan")
+    tombstones = relationship("Tombstone", back_populates="user", cascade="all, delete-orphan")
+    refresh_sessions = relationship("RefreshSession", back_populates="user", cascade="all, delete-orphan")
     avatar_url = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
-class BlacklistedToken(Base):
-    __tablename__ = "blacklisted_tokens"
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
 
-    id = Column(Integer, primary_key=True, index=True)
-    token = Column(String, unique=True, index=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
\ No newline at end of file
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)
+
+class RefreshSession(Base):
+    __tablename__ = "refresh_sessions"
+
+    # One row per logged-in device; token_id is the jti of the only refresh
+    # token of the session that may still be exchanged.
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_id = Column(String(32), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    user = relationship("User", back_populates="refresh_sessions")
\ No newline at end of file
@@ -1,11 +1,15 @@
 import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from database.session import Base
 
 
 class WaterIntake(Base):
     __tablename__ = "water_intake"
+    __table_args__ = (
+        Index("uq_water_intake_user_date", "user_id", "date", unique=True),
+        Index("ix_water_intake_user_timestamp", "user_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -19,12 +23,54 @@ class WaterIntake(Base):
 
 class WaterIntakeRecord(Base):
     __tablename__ = "water_intake_records"
+    __table_args__ = (
+        Index("ix_water_intake_records_user_date_timestamp", "user_id", "date", "timestamp"),
+        Index("uq_water_intake_records_user_client_id", "user_id", "client_id", unique=True),
+        Index("ix_water_intake_records_user_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     amount = Column(Float, nullable=False)
     date = Column(String, nullable=False)  # Format: YYYY-MM-DD
     timestamp = Column(DateTime, nullable=False)
+    client_id = Column(String(64), nullable=True)  # Set by offline sync, unique per user
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)  # Server time, used by delta sync
 
     # Relationship with User model
-    user = relationship("User", back_populates="water_intake_records")
\ No newline at end of file
+    user = relationship("User", back_populates="water_intake_records")
+
+
+class WaterIntakeWeekly(Base):
+    """Per-user weekly rollup of the daily totals, maintained on every write"""
+    __tablename__ = "water_intake_weekly"
+    __table_args__ = (
+        Index("uq_water_intake_weekly_user_week", "user_id", "week_start", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    week_start = Column(String, nullable=False)  # Monday, format: YYYY-MM-DD
+    total = Column(Float, nullable=False, default=0)
+    days_logged = Column(Integer, nullable=False, default=0)
+    goal_days = Column(Integer, nullable=False, default=0)
+    goal_mask = Column(Integer, nullable=False, default=0)  # bit 0 = Monday, set when the goal was met
+
+    user = relationship("User", back_populates="water_intake_weekly")
+
+
+class WaterIntakeMonthly(Base):
+    """Per-user monthly rollup of the daily totals, maintained on every write"""
+    __tablename__ = "water_intake_monthly"
+    __table_args__ = (
+        Index("uq_water_intake_monthly_user_month", "user_id", "month", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(String, nullable=False)  # Format: YYYY-MM
+    total = Column(Float, nullable=False, default=0)
+    days_logged = Column(Integer, nullable=False, default=0)
+    goal_days = Column(Integer, nullable=False, default=0)
+
+    user = relationship("User", back_populates="water_intake_monthly")
\ No newline at end of file
@@ -0,0 +1,54 @@
+import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from database.session import Base
+
+
+class WorkoutEvent(Base):
+    """Append-only log of completed sets; training_progress only keeps the latest state"""
+    __tablename__ = "workout_events"
+    __table_args__ = (
+        Index("ix_workout_events_user_completed_at", "user_id", "completed_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day_index = Column(Integer, nullable=False)
+    exercise_id = Column(String, nullable=False)
+    body_part = Column(String, nullable=False)
+    sets = Column(Integer, nullable=False)  # Sets done since the previous event for the exercise that day
+    completed_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    user = relationship("User", back_populates="workout_events")
+
+
+class WorkoutWeeklyBucket(Base):
+    """Sets per user, week and body part, maintained as events are appended"""
+    __tablename__ = "workout_weekly_buckets"
+    __table_args__ = (
+        Index("uq_workout_weekly_buckets_user_week_body_part", "user_id", "week_start", "body_part", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    week_start = Column(String, nullable=False)  # Monday, format: YYYY-MM-DD
+    body_part = Column(String, nullable=False)
+    sets = Column(Integer, nullable=False, default=0)
+
+    user = relationship("User", back_populates="workout_weekly_buckets")
+
+
+class WorkoutMonthlyBucket(Base):
+    """Sessions (days with a workout) and sets per user and month"""
+    __tablename__ = "workout_monthly_buckets"
+    __table_args__ = (
+        Index("uq_workout_monthly_buckets_user_month", "user_id", "month", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(String, nullable=False)  # Format: YYYY-MM
+    sessions = Column(Integer, nullable=False, default=0)
+    sets = Column(Integer, nullable=False, default=0)
+
+    user = relationship("User", back_populates="workout_monthly_buckets")
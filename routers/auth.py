@@ -1,10 +1,20 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from auth.jwt import create_access_token, create_refresh_token
-from database.session import get_db
+from jose import JWTError
+from auth.jwt import create_access_token, create_refresh_token, decode_token, get_token_id
+from auth.revocation import revocation_store
+from config import REFRESH_TOKEN_EXPIRE_DAYS
+from crud.token import create_refresh_session, rotate_refresh_session, delete_refresh_session
+from utils.rate_limit import RateLimiter, ConcurrencyLimiter
+from database.session import Database, get_db, get_read_db
 from schemas.user import Token, RefreshTokenRequest
-from crud.user import authenticate_user, blacklist_token, get_user_by_email
+from crud.user import get_user_by_email
+from auth.hashing import get_password_hash_async, verify_password_async
+from auth.user_cache import invalidate_token
 import logging
 from crud.user import create_user, get_user
 from schemas.user import UserCreate, UserOut
@@ -15,60 +25,116 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 logger = logging.getLogger(__name__)
 
 
-@auth_router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if get_user(db, user.username):
+def issue_tokens(db: Session, user, session_id: Optional[str] = None, token_id: Optional[str] = None):
+    """Creates an access/refresh token pair.
+
+    Without `session_id` a new refresh session is started (login); otherwise
+    the session's current refresh token `token_id` is rotated out. Returns
+    None if that token is no longer the session's current one.
+    """
+    new_token_id = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+    if session_id is None:
+        session_id = uuid.uuid4().hex
+        create_refresh_session(db, session_id, user.id, new_token_id, expires_at)
+    elif not rotate_refresh_session(db, session_id, user.id, token_id, new_token_id, expires_at):
+        return None
+
+    claims = {"sub": user.username, "sid": session_id}
+    return {
+        "access_token": create_access_token(claims),
+        "refresh_token": create_refresh_token({**claims, "jti": new_token_id}, expires_at),
+        "token_type": "bearer"
+    }
+
+
+@auth_router.post(
+    "/register",
+    response_model=UserOut,
+    dependencies=[Depends(RateLimiter(times=5, seconds=60)), Depends(ConcurrencyLimiter(16))],
+)
+async def register(user: UserCreate, db: Database = Depends(get_db)):
+    if await db.run(get_user, user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    if get_user_by_email(db, user.email):
+    if await db.run(get_user_by_email, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    return create_user(db, user.username, user.email, user.password, user.first_name, user.last_name, user.gender)
+    hashed_password = await get_password_hash_async(user.password)
+    return await db.run(create_user, user.username, user.email, hashed_password, user.first_name, user.last_name, user.gender)
 
 
 @auth_router.get("/check-username")
-def check_username(username: str, db: Session = Depends(get_db)):
-    if get_user(db, username):
+async def check_username(username: str, db: Database = Depends(get_read_db)):
+    if await db.run(get_user, username):
         raise HTTPException(status_code=400, detail="Username already taken")
     return {"available": True}
 
 
 @auth_router.get("/check-email")
-def check_email(email: str, db: Session = Depends(get_db)):
-    if get_user_by_email(db, email):
+async def check_email(email: str, db: Database = Depends(get_read_db)):
+    if await db.run(get_user_by_email, email):
         raise HTTPException(status_code=400, detail="Email already taken")
     return {"available": True}
 
 
-@auth_router.post("/token", response_model=Token)
-def login_for_access_token(
+@auth_router.post(
+    "/token",
+    response_model=Token,
+    dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(ConcurrencyLimiter(32))],
+)
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    user = await db.run(get_user, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         logger.warning(f"Failed login attempt: {form_data.username}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     logger.info(f"User {user.username} logged in")
-    return {
-        "access_token": create_access_token({"sub": user.username}),
-        "refresh_token": create_refresh_token({"sub": user.username}),
-        "token_type": "bearer"
-    }
+    return await db.run(issue_tokens, user)
 
 
-@auth_router.post("/refresh", response_model=Token)
-def refresh_token(refresh_request: RefreshTokenRequest):
-    return {
-        "access_token": create_access_token({"sub": "username"}),
-        "refresh_token": create_refresh_token({"sub": "username"}),
-        "token_type": "bearer"
-    }
+@auth_router.post("/refresh", response_model=Token, dependencies=[Depends(RateLimiter(times=30, seconds=60))])
+async def refresh_token(refresh_request: RefreshTokenRequest, db: Database = Depends(get_db)):
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+    try:
+        payload = decode_token(refresh_request.refresh_token)
+    except JWTError:
+        raise credentials_exception
+
+    username = payload.get("sub")
+    session_id = payload.get("sid")
+    token_id = payload.get("jti")
+    if payload.get("type") != "refresh" or not username or not session_id or not token_id:
+        raise credentials_exception
+
+    user = await db.run(get_user, username)
+    if not user or not user.is_active:
+        raise credentials_exception
+
+    tokens = await db.run(issue_tokens, user, session_id, token_id)
+    if tokens is None:
+        logger.warning(f"Stale or reused refresh token for user {user.id}, session {session_id} revoked")
+        raise credentials_exception
+
+    return tokens
 
 
 @auth_router.post("/logout")
-def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    blacklist_token(db, token)
-    logger.info(f"Token blacklisted: {token[:10]}...")
+async def logout(token: str = Depends(oauth2_scheme), db: Database = Depends(get_db)):
+    try:
+        payload = decode_token(token, verify_exp=False)
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+    token_id = get_token_id(payload, token)
+    await db.run(revocation_store.revoke, token_id, payload.get("exp"))
+    if payload.get("sid"):
+        await db.run(delete_refresh_session, payload["sid"])
+    invalidate_token(token)
+    logger.info(f"Token revoked: {token_id}")
     return {"message": "You have been logged out"}
@@ -1,19 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 import random
 
-from database.session import get_db
+from database.session import Database, get_db
 import crud.email_verification as crud
 from schemas.email_verification import EmailRequest, CodeVerifyRequest
 from utils.email import send_email
+from utils.rate_limit import RateLimiter, ConcurrencyLimiter
 
 router = APIRouter()
 
 
-@router.post("/verify-email/send")
-async def send_email_verification(req: EmailRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/verify-email/send",
+    dependencies=[Depends(RateLimiter(times=3, seconds=60)), Depends(ConcurrencyLimiter(8))],
+)
+async def send_email_verification(req: EmailRequest, db: Database = Depends(get_db)):
     code = str(random.randint(100000, 999999))
-    crud.create_code(db, email=req.email, code=code)
+    await db.run(crud.create_code, email=req.email, code=code)
 
     subject = "Your Verification Code"
     body = f"Your verification code is: {code}"
@@ -24,11 +27,11 @@ async def send_email_verification(req: EmailRequest, db: Session = Depends(get_d
 
     return {"message": "Verification code sent"}
 
-@router.post("/verify-email/verify")
-def verify_email_code(req: CodeVerifyRequest, db: Session = Depends(get_db)):
-    code_obj = crud.get_latest_code(db, email=req.email)
+@router.post("/verify-email/verify", dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+async def verify_email_code(req: CodeVerifyRequest, db: Database = Depends(get_db)):
+    code_obj = await db.run(crud.get_latest_code, email=req.email)
     if not code_obj or not crud.is_code_valid(code_obj, req.code):
         raise HTTPException(status_code=400, detail="Invalid or expired code")
 
-    crud.mark_code_as_used(db, code_obj)
+    await db.run(crud.mark_code_as_used, code_obj)
     return {"message": "Email verified successfully"}
@@ -0,0 +1,60 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from auth.dependencies import get_current_user
+from crud.exercise_search import exercise_search
+from database.session import Database, get_read_db
+from models.user import User
+from schemas.exercise import CatalogExercise, ExerciseSearchResponse
+from utils.pagination import decode_cursor, paginate
+
+router = APIRouter(tags=["Exercises"])
+
+
+async def _search_index(db: Database):
+    # Only a catalog reload or new catalog entries need the session
+    if exercise_search.stale():
+        await db.run(exercise_search.refresh)
+    if not exercise_search.stats()["documents"]:
+        # Not a client error: the catalog has not been imported yet
+        raise HTTPException(status_code=503, detail="The exercise catalog is not available")
+    return exercise_search
+
+
+@router.get("/", response_model=ExerciseSearchResponse)
+async def search_exercises(
+        response: Response,
+        q: Optional[str] = Query(None, max_length=100, description="Words or word fragments to match"),
+        body_part: Optional[str] = Query(None),
+        target: Optional[str] = Query(None),
+        equipment: Optional[str] = Query(None),
+        limit: int = Query(50, ge=1, le=200),
+        after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        db: Database = Depends(get_read_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Searches the exercise catalog, with facet counts for body part, target and equipment"""
+    index = await _search_index(db)
+    result = index.search(
+        q,
+        {"bodyPart": body_part, "target": target, "equipment": equipment},
+        limit,
+        decode_cursor(after, str, str),
+    )
+    result["items"] = paginate(
+        result["items"], limit, response, lambda item: (str(item.get("name", "")).lower(), item["id"])
+    )
+    return result
+
+
+@router.get("/{exercise_id}", response_model=CatalogExercise)
+async def read_exercise(
+        exercise_id: str,
+        db: Database = Depends(get_read_db),
+        current_user: User = Depends(get_current_user)
+):
+    index = await _search_index(db)
+    exercise = index.get(exercise_id)
+    if exercise is None:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    return exercise
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+
+from auth.dependencies import get_current_admin
+from models.user import User
+from utils import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/")
+def read_metrics(current_user: User = Depends(get_current_admin)):
+    """Returns in-process counters, timings and cache statistics; admins only"""
+    return metrics.snapshot()
@@ -1,36 +1,45 @@
 import random
 from fastapi import APIRouter, Depends, Form, HTTPException
-from sqlalchemy.orm import Session
-from database.session import get_db
+from database.session import Database, get_db
+from auth.hashing import get_password_hash_async
 from crud.user import get_user_by_email, update_user_password, save_reset_code, verify_reset_code
 from utils.email import send_email
+from utils.rate_limit import RateLimiter, ConcurrencyLimiter
 
 password_reset_router = APIRouter()
 
-@password_reset_router.post("/forgot")
-async def forgot_password(email: str = Form(...), db: Session = Depends(get_db)):
-    user = get_user_by_email(db, email)
+@password_reset_router.post(
+    "/forgot",
+    dependencies=[Depends(RateLimiter(times=3, seconds=60)), Depends(ConcurrencyLimiter(8))],
+)
+async def forgot_password(email: str = Form(...), db: Database = Depends(get_db)):
+    user = await db.run(get_user_by_email, email)
     if not user:
         raise HTTPException(status_code=404, detail="The user was not found")
 
     reset_code = str(random.randint(100000, 999999))
-    save_reset_code(db, email, reset_code)
+    await db.run(save_reset_code, email, reset_code)
 
     email_body = f"Your password reset code: {reset_code}"
     await send_email(email, "Password Recovery", email_body)
 
     return {"message": "The code has been sent"}
 
-@password_reset_router.post("/verify")
-def verify_reset(email: str = Form(...), code: str = Form(...), db: Session = Depends(get_db)):
-    if verify_reset_code(db, email, code):
+@password_reset_router.post("/verify", dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+async def verify_reset(email: str = Form(...), code: str = Form(...), db: Database = Depends(get_db)):
+    if await db.run(verify_reset_code, email, code):
         return {"message": "The code is confirmed"}
     raise HTTPException(status_code=400, detail="Invalid code")
 
-@password_reset_router.post("/reset")
-def reset_password(email: str = Form(...), code: str = Form(...), new_password: str = Form(...), db: Session = Depends(get_db)):
-    if not verify_reset_code(db, email, code):
+@password_reset_router.post("/reset", dependencies=[Depends(RateLimiter(times=5, seconds=60))])
+async def reset_password(email: str = Form(...), code: str = Form(...), new_password: str = Form(...), db: Database = Depends(get_db)):
+    if not await db.run(verify_reset_code, email, code):
         raise HTTPException(status_code=400, detail="Invalid code")
 
-    update_user_password(db, get_user_by_email(db, email), new_password)
+    user = await db.run(get_user_by_email, email)
+    if not user:
+        raise HTTPException(status_code=404, detail="The user was not found")
+
+    hashed_password = await get_password_hash_async(new_password)
+    await db.run(update_user_password, user.id, hashed_password)
     return {"message": "The password has been changed"}
@@ -1,32 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from database.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from database.session import Database, get_db, get_read_db
 from auth.dependencies import get_current_user
 from models.user import User
-from schemas.plan import PlanCreate, PlanOut
-from crud.plan import get_user_plan, save_plan, delete_user_plan
+from schemas.plan import PlanCreate, PlanOut, DayInfo, DayPatch, ExercisePatch
+from crud.exercise import CatalogEmpty
+from crud.plan_generator import generate_plan
+from crud.plan_response import build_plan_response, get_cached_plan_response
+from crud.plan import get_plan_response_version, save_plan, delete_user_plan
+from crud.plan import update_plan_day, update_plan_exercise, PlanVersionConflict
+from utils.etag import check_etag, if_match, make_etag
 import logging
-import json
-from typing import Dict, Any
+import random
+from typing import Dict, Any, Optional
+from pydantic import ValidationError
+from config import PLAN_LOG_SAMPLE_RATE, PLAN_LOG_MAX_BYTES
 from fastapi.responses import JSONResponse
 
 router = APIRouter(tags=["Plan"])
 logger = logging.getLogger(__name__)
 
 
+def _plan_etag(user_id: int, version, hydrate: bool, encoding: Optional[str] = None) -> str:
+    """Each content encoding is its own representation and gets its own strong ETag"""
+    if encoding is None:
+        return make_etag("plan", user_id, version, hydrate)
+    return make_etag("plan", user_id, version, hydrate, encoding)
+
+
+def _log_plan_body(user_id: int, body: bytes):
+    """Logs a sample of incoming plan bodies at DEBUG, truncated to PLAN_LOG_MAX_BYTES"""
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= PLAN_LOG_SAMPLE_RATE:
+        return
+    excerpt = body[:PLAN_LOG_MAX_BYTES].decode(errors="replace")
+    suffix = f"... ({len(body)} bytes)" if len(body) > PLAN_LOG_MAX_BYTES else ""
+    logger.debug(f"Plan body for user {user_id}: {excerpt}{suffix}")
+
+
 @router.get("/", response_model=PlanOut)
-def read_plan(
-        db: Session = Depends(get_db),
+async def read_plan(
+        request: Request,
+        response: Response,
+        hydrate: bool = Query(True, description="Fill in exercise details from the catalog; false returns the stored per-user fields only"),
+        db: Database = Depends(get_read_db),
         current_user: User = Depends(get_current_user)
 ):
     """Gets the current user's workout plan"""
     try:
-        plan = get_user_plan(db, current_user.id)
-        if not plan:
+        # The version alone answers revalidations and finds the cached body
+        version = await db.run(get_plan_response_version, current_user.id, hydrate)
+        if version is None:
             logger.info(f"No plan found for user {current_user.id}")
             raise HTTPException(status_code=404, detail="Plan not found")
+        not_modified = check_etag(
+            request, response,
+            _plan_etag(current_user.id, version, hydrate), _plan_etag(current_user.id, version, hydrate, "gzip"),
+        )
+        if not_modified:
+            return not_modified
+
+        cached = get_cached_plan_response(current_user.id, version, hydrate)
+        if cached is None:
+            cached = await db.run(build_plan_response, current_user.id, hydrate)
+            if cached is None:
+                logger.info(f"No plan found for user {current_user.id}")
+                raise HTTPException(status_code=404, detail="Plan not found")
         logger.info(f"Plan retrieved successfully for user {current_user.id}")
-        return plan
+
+        headers = {"ETag": _plan_etag(current_user.id, cached.version, hydrate), "Vary": "Accept-Encoding"}
+        if cached.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            headers["ETag"] = _plan_etag(current_user.id, cached.version, hydrate, "gzip")
+            headers["Content-Encoding"] = "gzip"
+            return Response(cached.gzip_body, media_type="application/json", headers=headers)
+        return Response(cached.body, media_type="application/json", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -40,39 +85,36 @@ def read_plan(
 @router.post("/", response_model=PlanOut)
 async def create_or_update_plan(
         request: Request,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
     """Creates or updates a training plan """
     try:
         body = await request.body()
-        raw_data = body.decode()
-        logger.info(f"Raw request body: {raw_data}")
-
-        try:
-            json_data = json.loads(raw_data)
-            logger.info(f"Parsed JSON data: {json.dumps(json_data, indent=2)}")
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {str(e)}")
-            return JSONResponse(
-                status_code=400,
-                content={"message": "Invalid JSON format", "error": str(e)}
-            )
+        _log_plan_body(current_user.id, body)
 
+        # Parsed and validated in one pass by pydantic-core, without json.loads
         try:
-            plan = PlanCreate(**json_data)
-            logger.info(f"Created plan object successfully")
-        except Exception as e:
-            logger.error(f"PlanCreate validation error: {str(e)}")
+            plan = PlanCreate.model_validate_json(body)
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors()):
+                logger.error(f"JSON decode error for user {current_user.id}: {str(e)}")
+                return JSONResponse(
+                    status_code=400,
+                    content={"message": "Invalid JSON format", "error": str(e)}
+                )
+            logger.error(f"PlanCreate validation error for user {current_user.id}: {str(e)}")
             return JSONResponse(
                 status_code=422,
                 content={"message": "Invalid plan data", "error": str(e)}
             )
+        logger.info(f"Received plan for user {current_user.id}: {len(plan.days)} days, {len(body)} bytes")
 
         try:
-            result = save_plan(db, current_user.id, plan)
+            await db.run(save_plan, current_user.id, plan)
             logger.info(f"Plan saved successfully for user {current_user.id}")
-            return result
+            # The validated upload is the hydrated plan; no need to rebuild it
+            return plan
         except Exception as e:
             logger.error(f"Error saving plan: {str(e)}")
             return JSONResponse(
@@ -88,14 +130,102 @@ async def create_or_update_plan(
         )
 
 
+@router.post("/generate", response_model=PlanOut)
+async def generate_user_plan(
+        days: int = Query(3, ge=1, le=7, description="Number of training days in the plan"),
+        exercises_per_day: int = Query(6, ge=1, le=12),
+        db: Database = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Builds and saves a plan for the user's training program, location and experience"""
+    try:
+        plan = await db.run(generate_plan, current_user, days, exercises_per_day)
+    except CatalogEmpty:
+        logger.warning(f"Plan generation for user {current_user.id} failed: the exercise catalog is empty")
+        raise HTTPException(status_code=503, detail="The exercise catalog is not available")
+    if plan is None:
+        logger.info(f"No catalog exercises match the training settings of user {current_user.id}")
+        raise HTTPException(status_code=404, detail="No exercises match your training settings")
+
+    await db.run(save_plan, current_user.id, plan)
+    logger.info(f"Plan generated for user {current_user.id}: {len(plan.days)} days")
+    return plan
+
+
+async def _patch_plan(request: Request, response: Response, db: Database, user_id: int, func, *args):
+    """Runs a partial plan update, honouring If-Match against the plan's ETag"""
+    version = await db.run(get_plan_response_version, user_id, True)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    plan_version, catalog_version = version
+    etags = [
+        _plan_etag(user_id, hydrate_version, hydrate, encoding)
+        for hydrate, hydrate_version in ((True, version), (False, plan_version))
+        for encoding in (None, "gzip")
+    ]
+    if not if_match(request, *etags):
+        raise HTTPException(status_code=412, detail="The plan has changed, reload it and retry")
+
+    expected = plan_version if "if-match" in request.headers else None
+    try:
+        result = await db.run(func, user_id, *args, expected)
+    except PlanVersionConflict:
+        raise HTTPException(status_code=412, detail="The plan has changed, reload it and retry")
+    except ValidationError as e:
+        # e.g. an explicit null for a required field such as sets or part
+        return JSONResponse(
+            status_code=422,
+            content={"message": "Invalid plan data", "error": str(e)}
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Plan day or exercise not found")
+
+    day, updated_at = result
+    response.headers["ETag"] = _plan_etag(user_id, (updated_at, catalog_version), True)
+    return day
+
+
+@router.patch("/days/{day_index}", response_model=DayInfo)
+async def patch_plan_day(
+        day_index: int,
+        changes: DayPatch,
+        request: Request,
+        response: Response,
+        db: Database = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Updates one day of the plan; send If-Match with the plan's ETag to avoid overwriting other edits"""
+    return await _patch_plan(
+        request, response, db, current_user.id, update_plan_day,
+        day_index, changes.model_dump(exclude_unset=True),
+    )
+
+
+@router.patch("/days/{day_index}/exercises/{exercise_id}", response_model=DayInfo)
+async def patch_plan_exercise(
+        day_index: int,
+        exercise_id: str,
+        changes: ExercisePatch,
+        request: Request,
+        response: Response,
+        db: Database = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Updates one exercise of a plan day and returns the day"""
+    return await _patch_plan(
+        request, response, db, current_user.id, update_plan_exercise,
+        day_index, exercise_id, changes.model_dump(exclude_unset=True),
+    )
+
+
 @router.delete("/")
-def delete_plan(
-        db: Session = Depends(get_db),
+async def delete_plan(
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
     """Deletes the user's training plan"""
     try:
-        delete_user_plan(db, current_user.id)
+        await db.run(delete_user_plan, current_user.id)
         logger.info(f"Plan deleted successfully for user {current_user.id}")
         return {"status": "success", "message": "Plan has been deleted"}
     except Exception as e:
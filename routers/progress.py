@@ -1,41 +1,93 @@
-from typing import List, Dict
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Dict, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
 
 from auth.dependencies import get_current_user
-from database.session import get_db
-from schemas.progress import ProgressEntry, ProgressCreate
-from crud.progress import get_progress, get_day_progress, upsert_progress, delete_all_user_progress
+from database.session import Database, get_db, get_read_db
+from schemas.progress import ProgressEntry, ProgressCreate, ProgressSummary, WorkoutWeekStats, WorkoutMonthStats
+from crud.progress import get_progress, get_progress_version, get_day_progress, upsert_progress, upsert_progress_batch, delete_all_user_progress
+from crud.progress_summary import get_progress_summary
+from crud.workout import get_weekly_workout_stats, get_monthly_workout_stats
+from utils.etag import check_etag, make_etag
+from utils.pagination import decode_cursor, paginate
 
 router = APIRouter(tags=["Progress"])
 
 @router.get("/", response_model=List[ProgressEntry])
-def read_progress(
-    db: Session = Depends(get_db),
+async def read_progress(
+    request: Request,
+    response: Response,
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of entries"),
+    db: Database = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
-    return get_progress(db, current_user.id)
+    cursor = decode_cursor(after, int, str)
+    version = await db.run(get_progress_version, current_user.id)
+    not_modified = check_etag(request, response, make_etag("progress", current_user.id, version, after, limit))
+    if not_modified:
+        return not_modified
+
+    entries = await db.run(get_progress, current_user.id, limit + 1, cursor)
+    return paginate(entries, limit, response, lambda entry: (entry.day_index, entry.exercise_id))
+
+@router.get("/summary", response_model=ProgressSummary)
+async def read_progress_summary(
+    db: Database = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Per-day and overall completion of the current plan (sets completed vs planned sets)"""
+    summary = await db.run(get_progress_summary, current_user.id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return summary
+
+@router.get("/stats/weekly", response_model=List[WorkoutWeekStats])
+async def read_weekly_workout_stats(
+    weeks: int = Query(12, ge=1, le=260, description="Number of weeks to look back"),
+    db: Database = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Sets per body part per week, from the weekly buckets"""
+    return await db.run(get_weekly_workout_stats, current_user.id, weeks)
+
+@router.get("/stats/monthly", response_model=List[WorkoutMonthStats])
+async def read_monthly_workout_stats(
+    months: int = Query(12, ge=1, le=120, description="Number of months to retrieve"),
+    db: Database = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Workout sessions (days with completed sets) and sets per month"""
+    return await db.run(get_monthly_workout_stats, current_user.id, months)
 
 @router.get("/{day_index}", response_model=List[ProgressEntry])
-def read_day_progress(
+async def read_day_progress(
     day_index: int,
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
-    return get_day_progress(db, current_user.id, day_index)
+    return await db.run(get_day_progress, current_user.id, day_index)
 
 @router.post("/", response_model=ProgressEntry)
-def create_or_update_progress(
+async def create_or_update_progress(
     progress_data: ProgressCreate,
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    return await db.run(upsert_progress, current_user.id, progress_data)
+
+@router.post("/batch", response_model=List[ProgressEntry])
+async def create_or_update_progress_batch(
+    entries: List[ProgressCreate] = Body(..., min_length=1, max_length=500),
+    db: Database = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    return upsert_progress(db, current_user.id, progress_data)
+    """Saves all entries of a workout session, possibly across several days, in one transaction"""
+    return await db.run(upsert_progress_batch, current_user.id, entries)
 
 @router.delete("/", response_model=Dict[str, str])
-def clear_user_progress(
-    db: Session = Depends(get_db),
+async def clear_user_progress(
+    db: Database = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    delete_all_user_progress(db, current_user.id)
+    await db.run(delete_all_user_progress, current_user.id)
     return {"status": "success", "message": "All progress has been deleted"}
\ No newline at end of file
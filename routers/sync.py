@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+
+from auth.dependencies import get_current_user
+from crud.sync import get_changes
+from database.session import Database, get_db
+from models.user import User
+from schemas.sync import SyncChangesResponse
+from utils.pagination import decode_cursor, encode_cursor
+
+router = APIRouter(tags=["Sync"])
+
+
+@router.get("/changes", response_model=SyncChangesResponse)
+async def read_changes(
+        since: Optional[str] = Query(None, description="Token returned by the previous call"),
+        # Always the primary: the token is the app clock, so rows a lagging
+        # replica has not applied yet would fall behind it and never be sent
+        db: Database = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Progress, plan and water rows changed or deleted since the previous sync"""
+    token = decode_cursor(since, datetime.fromisoformat)
+    changes = await db.run(get_changes, current_user.id, token[0] if token else None)
+    changes["token"] = encode_cursor(changes["token"].isoformat())
+    return changes
@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+from database.session import Database, get_db
 from schemas.user import UserOut, UserProfileUpdate, ChangePasswordRequest
 from models.user import User
-from crud.user import delete_user
+from crud.user import delete_user, update_user_profile, update_avatar
+from crud.user import update_training_program as crud_update_training_program
+from crud.user import update_training_location as crud_update_training_location
+from crud.user import update_training_experience as crud_update_training_experience
 from auth.dependencies import get_current_user
 from schemas.user import TrainingProgramUpdate
 from schemas.user import TrainingLocationUpdate
 from schemas.user import TrainingExperienceUpdate
 from crud.user import update_user_password
-from auth.hashing import verify_password
-from crud.plan import delete_user_plan
+from auth.hashing import get_password_hash_async, verify_password_async
+from utils.etag import check_etag, make_etag
+from utils.rate_limit import UserRateLimiter, ConcurrencyLimiter
 import logging
 import os
 import uuid
@@ -26,73 +30,28 @@ if not os.path.exists(AVATAR_DIR):
     os.makedirs(AVATAR_DIR)
 
 @users_router.get("/me", response_model=UserOut)
-def read_users_me(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    user = db.query(User).filter(User.id == current_user.id).first()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="The user was not found")
-
-    return user
+async def read_users_me(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    not_modified = check_etag(request, response, make_etag("user", current_user.id, current_user.updated_at))
+    if not_modified:
+        return not_modified
+    return current_user
 
 
 @users_router.post("/update-profile")
-def update_profile(
+async def update_profile(
         user_data: UserProfileUpdate,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
+    user = await db.run(update_user_profile, current_user.id, user_data)
     if not user:
         raise HTTPException(status_code=404, detail="The user was not found")
 
-    should_reset_plan = False
-
-    if user_data.training_program is not None and user.training_program != user_data.training_program:
-        should_reset_plan = True
-        logger.info(
-            f"User {user.id}: training program changed from '{user.training_program}' to '{user_data.training_program}'")
-
-    if user_data.training_location is not None and user.training_location != user_data.training_location:
-        should_reset_plan = True
-        logger.info(
-            f"User {user.id}: training location changed from '{user.training_location}' to '{user_data.training_location}'")
-
-    if user_data.training_experience is not None and user.training_experience != user_data.training_experience:
-        should_reset_plan = True
-        logger.info(
-            f"User {user.id}: training experience changed from '{user.training_experience}' to '{user_data.training_experience}'")
-
-    if user_data.first_name is not None:
-        user.first_name = user_data.first_name
-    if user_data.last_name is not None:
-        user.last_name = user_data.last_name
-    if user_data.gender is not None:
-        user.gender = user_data.gender
-    if user_data.weight is not None:
-        user.weight = user_data.weight
-    if user_data.height is not None:
-        user.height = user_data.height
-    if user_data.age is not None:
-        user.age = user_data.age
-    if user_data.training_program is not None:
-        user.training_program = user_data.training_program
-    if user_data.training_location is not None:
-        user.training_location = user_data.training_location
-    if user_data.training_experience is not None:
-        user.training_experience = user_data.training_experience
-
-    if should_reset_plan:
-        logger.info(f"User {user.id}: resetting workout plan due to profile changes")
-        delete_user_plan(db, current_user.id)
-
-    db.commit()
-    db.refresh(user)
-
     return {"message": "Profile has been successfully updated", "user": user}
 
 
 @users_router.get("/profile-status")
-def profile_status(current_user: User = Depends(get_current_user)):
+async def profile_status(current_user: User = Depends(get_current_user)):
     if current_user.weight is None or current_user.height is None or current_user.age is None:
         return {"profile_completed": False}
 
@@ -100,139 +59,130 @@ def profile_status(current_user: User = Depends(get_current_user)):
 
 
 @users_router.post("/set-program")
-def set_training_program(program_data: TrainingProgramUpdate, db: Session = Depends(get_db),
-                         current_user: User = Depends(get_current_user)):
-    user = db.query(User).filter(User.id == current_user.id).first()
+async def set_training_program(program_data: TrainingProgramUpdate, db: Database = Depends(get_db),
+                               current_user: User = Depends(get_current_user)):
+    user = await db.run(crud_update_training_program, current_user.id, program_data.training_program)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    if user.training_program != program_data.training_program:
-        logger.info(
-            f"User {user.id}: training program changed from '{user.training_program}' to '{program_data.training_program}'")
-        delete_user_plan(db, current_user.id)
-
-    user.training_program = program_data.training_program
-    db.commit()
-    db.refresh(user)
-
     return {"message": "The training program has been updated", "training_program": user.training_program}
 
 
 @users_router.post("/set-location")
-def set_training_location(location_data: TrainingLocationUpdate, db: Session = Depends(get_db),
-                          current_user: User = Depends(get_current_user)):
-    user = db.query(User).filter(User.id == current_user.id).first()
+async def set_training_location(location_data: TrainingLocationUpdate, db: Database = Depends(get_db),
+                                current_user: User = Depends(get_current_user)):
+    user = await db.run(crud_update_training_location, current_user.id, location_data.training_location)
     if not user:
         raise HTTPException(status_code=404, detail="The user was not found")
 
-    if user.training_location != location_data.training_location:
-        logger.info(
-            f"User {user.id}: training location changed from '{user.training_location}' to '{location_data.training_location}'")
-        delete_user_plan(db, current_user.id)
-
-    user.training_location = location_data.training_location
-    db.commit()
-    db.refresh(user)
-
     return {"message": "The training location has been updated", "training_location": user.training_location}
 
 
 @users_router.post("/set-experience")
-def set_training_experience(experience_data: TrainingExperienceUpdate, db: Session = Depends(get_db),
-                            current_user: User = Depends(get_current_user)):
-    user = db.query(User).filter(User.id == current_user.id).first()
+async def set_training_experience(experience_data: TrainingExperienceUpdate, db: Database = Depends(get_db),
+                                  current_user: User = Depends(get_current_user)):
+    user = await db.run(crud_update_training_experience, current_user.id, experience_data.training_experience)
     if not user:
         raise HTTPException(status_code=404, detail="The user was not found")
 
-    if user.training_experience != experience_data.training_experience:
-        logger.info(
-            f"User {user.id}: training experience changed from '{user.training_experience}' to '{experience_data.training_experience}'")
-        delete_user_plan(db, current_user.id)
-
-    user.training_experience = experience_data.training_experience
-    db.commit()
-    db.refresh(user)
-
     return {"message": "The training level has been updated", "training_experience": user.training_experience}
 
 
 @users_router.post("/update-training-program")
-def update_training_program(
+async def update_training_program(
         data: TrainingProgramUpdate,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if user and user.training_program != data.training_program:
-        delete_user_plan(db, current_user.id)
+    if not await db.run(crud_update_training_program, current_user.id, data.training_program):
+        raise HTTPException(status_code=404, detail="The user was not found")
 
-    update_training_program(db, current_user, data.training_program)
     return {"message": "The training plan has been successfully updated"}
 
 
 @users_router.post("/update-training-location")
-def update_training_location(
+async def update_training_location(
         data: TrainingLocationUpdate,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if user and user.training_location != data.training_location:
-        delete_user_plan(db, current_user.id)
+    if not await db.run(crud_update_training_location, current_user.id, data.training_location):
+        raise HTTPException(status_code=404, detail="The user was not found")
 
-    update_training_location(db, current_user, data.training_location)
     return {"message": "The training location has been successfully updated"}
 
 
 @users_router.post("/update-training-experience")
-def update_training_experience(
+async def update_training_experience(
         data: TrainingExperienceUpdate,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if user and user.training_experience != data.training_experience:
-        delete_user_plan(db, current_user.id)
+    if not await db.run(crud_update_training_experience, current_user.id, data.training_experience):
+        raise HTTPException(status_code=404, detail="The user was not found")
 
-    update_training_experience(db, current_user, data.training_experience)
     return {"message": "The training level has been successfully updated"}
 
 
 @users_router.delete("/delete-account")
-def delete_account(
-        db: Session = Depends(get_db),
+async def delete_account(
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
     if not current_user:
         raise HTTPException(status_code=404, detail="The user was not found")
 
     if current_user.avatar_url:
-        file_path = os.path.join(".", current_user.avatar_url.lstrip("/"))
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        _remove_media_file(current_user.avatar_url)
 
-    delete_user(db, current_user)
+    if not await db.run(delete_user, current_user.id):
+        raise HTTPException(status_code=404, detail="The user was not found")
 
     return {"message": "Account successfully deleted"}
 
 
 @users_router.post("/change-password")
-def change_password(
+async def change_password(
         request: ChangePasswordRequest,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
-    if not verify_password(request.old_password, current_user.hashed_password):
+    if not await verify_password_async(request.old_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect old password")
 
-    update_user_password(db, current_user, request.new_password)
+    hashed_password = await get_password_hash_async(request.new_password)
+    await db.run(update_user_password, current_user.id, hashed_password)
     return {"message": "Password updated successfully"}
 
 
-@users_router.post("/upload-avatar")
+def _remove_media_file(url: str):
+    file_path = os.path.join(".", url.lstrip("/"))
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def _save_avatar(contents: bytes, file_path: str, user_id: int):
+    try:
+        img = Image.open(io.BytesIO(contents))
+
+        max_size = (800, 800)
+        if img.width > max_size[0] or img.height > max_size[1]:
+            img.thumbnail(max_size, Image.LANCZOS)
+
+        img.save(file_path, optimize=True, quality=85)
+    except Exception as e:
+        logger.error(f"Error optimizing avatar for user {user_id}: {str(e)}")
+        with open(file_path, "wb") as f:
+            f.write(contents)
+
+
+@users_router.post(
+    "/upload-avatar",
+    dependencies=[Depends(UserRateLimiter(times=10, seconds=60)), Depends(ConcurrencyLimiter(4))],
+)
 async def upload_avatar(
         avatar: UploadFile = File(...),
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
 
@@ -245,49 +195,26 @@ async def upload_avatar(
     file_path = os.path.join(AVATAR_DIR, unique_filename)
 
     contents = await avatar.read()
-    
-    try:
-        img = Image.open(io.BytesIO(contents))
-        
-        max_size = (800, 800)
-        if img.width > max_size[0] or img.height > max_size[1]:
-            img.thumbnail(max_size, Image.LANCZOS)
-        
-        img.save(file_path, optimize=True, quality=85)
-    except Exception as e:
-        logger.error(f"Error optimizing avatar for user {current_user.id}: {str(e)}")
-        with open(file_path, "wb") as f:
-            f.write(contents)
+    await run_in_threadpool(_save_avatar, contents, file_path, current_user.id)
 
     avatar_url = f"/media/avatars/{unique_filename}"
 
-    user = db.query(User).filter(User.id == current_user.id).first()
-
-    if user.avatar_url:
-        old_avatar_path = os.path.join(".", user.avatar_url.lstrip("/"))
-        if os.path.exists(old_avatar_path):
-            os.remove(old_avatar_path)
-
-    user.avatar_url = avatar_url
-    db.commit()
+    old_avatar_url = await db.run(update_avatar, current_user.id, avatar_url)
+    if old_avatar_url:
+        _remove_media_file(old_avatar_url)
 
     return {"avatar_url": avatar_url}
 
 
 @users_router.delete("/delete-avatar")
 async def delete_avatar(
-    db: Session = Depends(get_db),
+    db: Database = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
-    
-    if user.avatar_url:
-        file_path = os.path.join(".", user.avatar_url.lstrip("/"))
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
-        user.avatar_url = None
-        db.commit()
+    old_avatar_url = await db.run(update_avatar, current_user.id, None)
+
+    if old_avatar_url:
+        _remove_media_file(old_avatar_url)
         return {"message": "Avatar removed"}
-    
-    raise HTTPException(status_code=404, detail="Avatar not found")
\ No newline at end of file
+
+    raise HTTPException(status_code=404, detail="Avatar not found")
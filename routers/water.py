@@ -1,147 +1,182 @@
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
 from auth.dependencies import get_current_user
-from database.session import get_db
+from database.session import Database, get_db, get_read_db
 from crud import water as water_crud
+from crud import water_stats as water_stats_crud
 from models.user import User
 from schemas.water import (
     WaterIntake,
-    WaterIntakeCreate,
     WaterIntakeRequest,
     WaterIntakeHistoryResponse,
     DailyWaterIntakeResponse,
     WaterIntakeRecord as WaterIntakeRecordSchema,
-    WaterIntakeRecordCreate
+    WaterIntakeRecordCreate,
+    WaterSyncRequest,
+    WaterSyncResponse,
+    WaterPeriodStats,
+    WaterStatsResponse,
 )
-from models.water import WaterIntakeRecord
+from utils.etag import check_etag, make_etag
+from utils.pagination import decode_cursor, paginate
+from utils.rate_limit import UserRateLimiter
 
 router = APIRouter(tags=["Water Tracking"])
 
 
 @router.get("/history", response_model=List[WaterIntake])
-def get_water_history(
-        limit: int = Query(30, description="Number of days to retrieve"),
-        db: Session = Depends(get_db),
+async def get_water_history(
+        response: Response,
+        limit: int = Query(30, ge=1, le=366, description="Number of days to retrieve"),
+        after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        db: Database = Depends(get_read_db),
         current_user: User = Depends(get_current_user)
 ):
-    history = water_crud.get_water_intake_history(db, current_user.id, limit)
-    return history
+    cursor = decode_cursor(after, str)
+    history = await db.run(
+        water_crud.get_water_intake_history, current_user.id, limit + 1, cursor[0] if cursor else None
+    )
+    return paginate(history, limit, response, lambda intake: (intake.date,))
 
 
 @router.get("/daily/{date}", response_model=DailyWaterIntakeResponse)
-def get_daily_water_intake(
+async def get_daily_water_intake(
         date: str,
-        db: Session = Depends(get_db),
+        request: Request,
+        response: Response,
+        limit: int = Query(200, ge=1, le=1000, description="Maximum number of records"),
+        after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        db: Database = Depends(get_read_db),
         current_user: User = Depends(get_current_user)
 ):
-    intake = water_crud.get_daily_water_intake(db, current_user.id, date)
+    cursor = decode_cursor(after, datetime.fromisoformat, int)
+    intake = await db.run(water_crud.get_daily_water_intake, current_user.id, date)
+
+    # Every change to the day's records also stamps its total
+    version = intake.timestamp if intake else None
+    not_modified = check_etag(
+        request, response, make_etag("water_daily", current_user.id, date, version, after, limit)
+    )
+    if not_modified:
+        return not_modified
+
     if not intake:
         return {"date": date, "total_amount": 0.0, "records": []}
 
-    # Get records and sort them by timestamp
-    records = water_crud.get_daily_water_records(db, current_user.id, date)
-    sorted_records = sorted(records, key=lambda x: x.timestamp)  # Sort by timestamp
+    # Records are returned oldest first
+    records = await db.run(water_crud.get_daily_water_records, current_user.id, date, limit + 1, cursor)
 
     return {
         "date": date,
         "total_amount": intake.amount,
-        "records": sorted_records
+        "records": paginate(records, limit, response, lambda record: (record.timestamp, record.id))
     }
 
 
+@router.get("/stats", response_model=WaterStatsResponse)
+async def get_water_stats(
+        db: Database = Depends(get_read_db),
+        current_user: User = Depends(get_current_user)
+):
+    return await db.run(water_stats_crud.get_water_stats, current_user.id, datetime.now().date())
+
+
+@router.get("/stats/weekly", response_model=List[WaterPeriodStats])
+async def get_weekly_water_stats(
+        limit: int = Query(12, ge=1, le=520, description="Number of weeks to retrieve"),
+        db: Database = Depends(get_read_db),
+        current_user: User = Depends(get_current_user)
+):
+    return await db.run(water_stats_crud.get_weekly_stats, current_user.id, limit)
+
+
+@router.get("/stats/monthly", response_model=List[WaterPeriodStats])
+async def get_monthly_water_stats(
+        limit: int = Query(12, ge=1, le=120, description="Number of months to retrieve"),
+        db: Database = Depends(get_read_db),
+        current_user: User = Depends(get_current_user)
+):
+    return await db.run(water_stats_crud.get_monthly_stats, current_user.id, limit)
+
+
 @router.post("/add", response_model=WaterIntake)
-def add_water_intake(
+async def add_water_intake(
         request: WaterIntakeRequest,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
 
     today = datetime.now().strftime("%Y-%m-%d")
 
-    water_intake = WaterIntakeCreate(date=today, amount=request.amount)
-    result = water_crud.create_water_intake(db, current_user.id, water_intake)
-
     if request.records:
-        for record in request.records:
-            water_crud.add_water_intake_record(db, current_user.id, today, record)
+        records = request.records
     elif request.amount > 0:
-        record = WaterIntakeRecordCreate(
-            amount=request.amount,
-            timestamp=datetime.now()
-        )
-        water_crud.add_water_intake_record(db, current_user.id, today, record)
+        records = [WaterIntakeRecordCreate(amount=request.amount, timestamp=datetime.now())]
+    else:
+        records = []
 
-    return result
+    return await db.run(water_crud.set_daily_water_intake, current_user.id, today, request.amount, records)
 
 
 @router.post("/records", response_model=WaterIntakeRecordSchema)
-def add_water_record(
+async def add_water_record(
         record: WaterIntakeRecordCreate,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
     today = datetime.now().strftime("%Y-%m-%d")
 
-    # Add the record
-    db_record = water_crud.add_water_intake_record(db, current_user.id, today, record)
-
-    # Update the daily total
-    existing_intake = water_crud.get_daily_water_intake(db, current_user.id, today)
-    if existing_intake:
-        new_amount = existing_intake.amount + record.amount
-    else:
-        new_amount = record.amount
+    # Insert the record and increment the daily total in one transaction
+    db_record, _ = await db.run(water_crud.log_water_intake_record, current_user.id, today, record)
+    return db_record
 
-    water_crud.update_water_intake(db, current_user.id, today, new_amount)
 
-    return db_record
+@router.post(
+    "/sync",
+    response_model=WaterSyncResponse,
+    dependencies=[Depends(UserRateLimiter(times=30, seconds=60))],
+)
+async def sync_water_records(
+        request: WaterSyncRequest,
+        db: Database = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Applies records queued while offline; already applied client ids are reported as duplicates"""
+    applied, duplicates, totals = await db.run(
+        water_crud.sync_water_intake_records, current_user.id, request.records
+    )
+    return {"applied": applied, "duplicates": duplicates, "totals": totals}
 
 
 @router.delete("/records/{record_id}")
-def delete_water_record(
+async def delete_water_record(
         record_id: int,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    record = db.query(WaterIntakeRecord).filter_by(id=record_id, user_id=current_user.id).first()
-    if not record:
+    if not await db.run(water_crud.remove_water_intake_record, record_id, current_user.id):
         raise HTTPException(status_code=404, detail="Record not found")
 
-    date = record.date
-    amount_to_deduct = record.amount
-
-    success = water_crud.delete_water_intake_record(db, record_id, current_user.id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Record not found")
-
-    daily_intake = water_crud.get_daily_water_intake(db, current_user.id, date)
-    if daily_intake:
-        new_amount = max(0, daily_intake.amount - amount_to_deduct)
-        water_crud.update_water_intake(db, current_user.id, date, new_amount)
-
     return {"message": "Record deleted successfully"}
 
 
 @router.delete("/daily/{date}")
-def delete_day_water_intake(
+async def delete_day_water_intake(
         date: str,
-        db: Session = Depends(get_db),
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    water_crud.delete_day_records(db, current_user.id, date)
-
-    water_crud.update_water_intake(db, current_user.id, date, 0)
+    await db.run(water_crud.clear_daily_water_intake, current_user.id, date)
 
     return {"message": f"All water intake data for {date} deleted"}
 
 
 @router.delete("/all")
-def delete_all_water_data(
-        db: Session = Depends(get_db),
+async def delete_all_water_data(
+        db: Database = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    water_crud.delete_all_water_data(db, current_user.id)
+    await db.run(water_crud.delete_all_water_data, current_user.id)
     return {"message": "All water intake data deleted"}
\ No newline at end of file
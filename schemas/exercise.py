@@ -0,0 +1,22 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class CatalogExercise(BaseModel):
+    id: str
+    name: str
+    bodyPart: Optional[str] = None
+    equipment: Optional[str] = None
+    gifUrl: Optional[str] = None
+    target: Optional[str] = None
+    secondaryTargets: Optional[List[str]] = None
+    instructions: Optional[List[str]] = None
+    programs: Optional[List[str]] = None
+    locations: Optional[List[str]] = None
+    experienceLevels: Optional[List[str]] = None
+
+
+class ExerciseSearchResponse(BaseModel):
+    total: int
+    items: List[CatalogExercise]
+    facets: Dict[str, Dict[str, int]]  # field -> value -> number of matches
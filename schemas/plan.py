@@ -69,4 +69,39 @@ class PlanOut(BaseModel):
         validate_by_name = True
         json_encoders = {
             datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+class DayPatch(BaseModel):
+    """Fields of a plan day to replace; exercises, when given, replace the whole list"""
+    dayIndex: Optional[int] = None
+    part: Optional[str] = None
+    exercises: Optional[List[Exercise]] = None
+
+    class Config:
+        extra = "allow"
+
+
+class ExercisePatch(BaseModel):
+    """Fields of a plan exercise to replace; a new id swaps the exercise"""
+    id: Optional[str] = None
+    name: Optional[str] = None
+    sets: Optional[int] = None
+    reps: Any = None
+    rest: Optional[str] = None
+    restSec: Optional[int] = None
+    notes: Optional[str] = None
+
+    bodyPart: Optional[str] = None
+    equipment: Optional[str] = None
+    gifUrl: Optional[str] = None
+    target: Optional[str] = None
+    secondaryTargets: Optional[List[str]] = None
+    instructions: Optional[List[str]] = None
+    programs: Optional[List[str]] = None
+    locations: Optional[List[str]] = None
+    experienceLevels: Optional[List[str]] = None
+    durationSec: Optional[int] = None
+
+    class Config:
+        extra = "allow"
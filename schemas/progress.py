@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 class ProgressEntry(BaseModel):
@@ -14,3 +15,30 @@ class ProgressCreate(BaseModel):
     day_index: int
     exercise_id: str
     sets_completed: int
+    body_part: Optional[str] = None  # Looked up in the plan when omitted
+
+class DaySummary(BaseModel):
+    day_index: int
+    part: Optional[str] = None
+    exercises_total: int
+    exercises_completed: int
+    total_sets: int
+    completed_sets: int
+    completion: float
+
+class WorkoutWeekStats(BaseModel):
+    week_start: str
+    total_sets: int
+    body_parts: Dict[str, int]
+
+class WorkoutMonthStats(BaseModel):
+    month: str
+    sessions: int
+    sets: int
+
+class ProgressSummary(BaseModel):
+    total_sets: int
+    completed_sets: int
+    completion: float
+    days_completed: int
+    days: List[DaySummary]
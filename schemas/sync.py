@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+from schemas.plan import PlanOut
+from schemas.progress import ProgressEntry
+from schemas.water import WaterIntake
+
+
+class TombstoneOut(BaseModel):
+    entity: str
+    key: str
+    deleted_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WaterRecordChange(BaseModel):
+    id: int
+    date: str
+    amount: float
+    timestamp: datetime
+    client_id: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SyncChangesResponse(BaseModel):
+    token: str  # Pass as `since` on the next call
+    full_sync: bool
+    deleted: List[TombstoneOut]  # Apply before the changed rows
+    plan: Optional[PlanOut] = None
+    progress: List[ProgressEntry]
+    water_intake: List[WaterIntake]
+    water_records: List[WaterRecordChange]
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class WaterIntakeRecordCreate(BaseModel):
@@ -52,4 +52,39 @@ class WaterIntakeHistoryResponse(BaseModel):
 
 class WaterIntakeRequest(BaseModel):
     amount: float
-    records: Optional[List[WaterIntakeRecordCreate]] = None
\ No newline at end of file
+    records: Optional[List[WaterIntakeRecordCreate]] = None
+
+
+class WaterSyncRecord(WaterIntakeRecordCreate):
+    client_id: str = Field(..., min_length=1, max_length=64)
+    date: Optional[str] = None  # Format: YYYY-MM-DD, defaults to the timestamp's date
+
+
+class WaterSyncRequest(BaseModel):
+    records: List[WaterSyncRecord] = Field(..., max_length=500)
+
+
+class WaterSyncResponse(BaseModel):
+    applied: List[str]
+    duplicates: List[str]
+    totals: List[WaterIntakeBase]
+
+
+
+class WaterPeriodStats(BaseModel):
+    period: str  # Week start (YYYY-MM-DD) or month (YYYY-MM)
+    total: float
+    days_logged: int
+    goal_days: int
+    average: float
+
+
+class WaterStatsResponse(BaseModel):
+    daily_goal: float
+    total_amount: float
+    days_logged: int
+    goal_days: int
+    goal_hit_rate: float
+    average: float
+    current_streak: int
+    longest_streak: int
@@ -0,0 +1,48 @@
+"""Imports the shared exercise catalog from a trusted JSON file.
+
+The file holds a list of exercises in the catalog shape (id, name, bodyPart,
+equipment, gifUrl, target, secondaryTargets, instructions, programs,
+locations, experienceLevels). Existing ids are replaced, other catalog
+entries are kept. Running app processes pick the changes up within
+EXERCISE_CATALOG_REFRESH_SECONDS.
+
+    python -m scripts.import_exercises exercises.json
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import TypeAdapter, ValidationError  # noqa: E402
+
+from crud.exercise import import_exercises  # noqa: E402
+from database.session import SessionLocal  # noqa: E402
+from schemas.exercise import CatalogExercise  # noqa: E402
+# The mappers of all models must be known before the first query
+import models.user  # noqa: E402,F401
+import models.plan  # noqa: E402,F401
+import models.progress  # noqa: E402,F401
+import models.water  # noqa: E402,F401
+import models.email_verification  # noqa: E402,F401
+import models.sync  # noqa: E402,F401
+import models.workout  # noqa: E402,F401
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path, help="JSON file with a list of exercises")
+    args = parser.parse_args()
+
+    try:
+        exercises = TypeAdapter(list[CatalogExercise]).validate_json(args.path.read_bytes())
+    except ValidationError as e:
+        sys.exit(f"Invalid exercise file {args.path}: {e}")
+
+    with SessionLocal() as db:
+        count = import_exercises(db, exercises)
+    print(f"Imported {count} exercises from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
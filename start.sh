@@ -1,2 +1,6 @@
 #!/bin/bash
-uvicorn main:app --host 0.0.0.0 --port $PORT
+set -e
+alembic upgrade head
+export DB_CREATE_ALL=${DB_CREATE_ALL:-false}
+uvicorn main:app --host 0.0.0.0 --port $PORT \
+    --proxy-headers --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-127.0.0.1}"
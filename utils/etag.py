@@ -0,0 +1,39 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag derived from row versions (ids, timestamps, counts), never from the body"""
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest()[:24] + '"'
+
+
+def check_etag(request: Request, response: Response, etag: str, *variants: str) -> Optional[Response]:
+    """Sets the ETag header, and returns a 304 response when If-None-Match matches it.
+
+    `variants` are the ETags of other representations of the same version
+    (e.g. gzip-encoded); a match on one of them answers 304 with that ETag.
+    """
+    response.headers["ETag"] = etag
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    for tag in (etag, *variants):
+        if "*" in candidates or tag in candidates or f"W/{tag}" in candidates:
+            return Response(status_code=304, headers={"ETag": tag})
+    return None
+
+
+def if_match(request: Request, *etags: str) -> bool:
+    """Whether the If-Match precondition holds for a resource currently at one of `etags`.
+
+    A missing header always holds, so clients that do not send it keep
+    last-write-wins behaviour.
+    """
+    header = request.headers.get("if-match")
+    if header is None:
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(etag in candidates for etag in etags)
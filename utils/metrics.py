@@ -0,0 +1,46 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(float)
+_timings: Dict[str, list] = {}
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def inc(name: str, value: float = 1) -> None:
+    """Increments a counter"""
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name: str, seconds: float) -> None:
+    """Records a duration sample (count, total, max)"""
+    with _lock:
+        timing = _timings.setdefault(name, [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = max(timing[2], seconds)
+
+
+def register_collector(name: str, collector: Callable[[], dict]) -> None:
+    """Registers a callable whose result is reported under `name` on every snapshot"""
+    _collectors[name] = collector
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+        timings = {
+            name: {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+                "max_ms": round(peak * 1000, 3),
+            }
+            for name, (count, total, peak) in _timings.items()
+        }
+    return {
+        "counters": counters,
+        "timings": timings,
+        **{name: collector() for name, collector in _collectors.items()},
+    }
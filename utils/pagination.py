@@ -0,0 +1,40 @@
+import base64
+import binascii
+import json
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """Opaque, URL-safe cursor holding the sort key of the last row of a page"""
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], *types: Callable) -> Optional[tuple]:
+    """Decodes a cursor made by encode_cursor, converting each value with `types`"""
+    if cursor is None:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(rows: list, limit: int, response: Response, cursor_key: Callable) -> list:
+    """Trims the extra row fetched to detect a next page and advertises its cursor.
+
+    Callers query `limit + 1` rows; when the extra row is present, the cursor
+    of the last returned row is sent in the X-Next-Cursor header so that the
+    response body keeps its shape.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*cursor_key(rows[-1]))
+    return rows
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+import zlib
+from typing import Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from auth.dependencies import get_current_user
+from config import RATE_LIMIT_ENABLED, REDIS_URL
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Per-process sliding-window counters.
+
+    Keys are spread over independently locked shards so that unrelated
+    clients never contend on a single lock.
+    """
+
+    def __init__(self, shards: int = 32, prune_every: int = 4096):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._prune_every = prune_every
+        self._writes = [0] * shards
+
+    async def hit(self, key: str, window: int) -> Tuple[int, int]:
+        """Counts a hit and returns (hits in current window, hits in previous window)"""
+        index = int(time.time() // window)
+        shard_no = zlib.crc32(key.encode()) % len(self._shards)
+        counters, lock = self._shards[shard_no]
+
+        with lock:
+            stored_index, current, previous = counters.get(key, (index, 0, 0))
+            if stored_index == index - 1:
+                current, previous = 0, current
+            elif stored_index != index:
+                current, previous = 0, 0
+            current += 1
+            counters[key] = (index, current, previous)
+
+            self._writes[shard_no] += 1
+            if self._writes[shard_no] >= self._prune_every:
+                self._writes[shard_no] = 0
+                for stale in [k for k, v in counters.items() if v[0] < index - 1]:
+                    del counters[stale]
+
+        return current, previous
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """Sliding-window counters shared by every worker through Redis"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def hit(self, key: str, window: int) -> Tuple[int, int]:
+        index = int(time.time() // window)
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.incr(f"{key}:{index}")
+            pipe.expire(f"{key}:{index}", window * 2)
+            pipe.get(f"{key}:{index - 1}")
+            current, _, previous = await pipe.execute()
+        return int(current), int(previous or 0)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_backend = MemoryBackend()
+
+
+async def init_rate_limiter():
+    global _backend
+    if REDIS_URL:
+        _backend = RedisBackend(REDIS_URL)
+        logger.info("Rate limiting uses the Redis backend")
+    else:
+        _backend = MemoryBackend()
+        logger.info("Rate limiting uses the in-process backend")
+
+
+async def close_rate_limiter():
+    await _backend.close()
+
+
+class RateLimiter:
+    """Route dependency allowing `times` requests per `seconds` for each client IP.
+
+    Uses a sliding-window counter: the previous window's count is weighted by
+    how much of it still overlaps the trailing `seconds`.
+    """
+
+    def __init__(self, times: int, seconds: int = 60):
+        self.times = times
+        self.seconds = seconds
+
+    async def __call__(self, request: Request):
+        # Behind a reverse proxy this is the forwarded client address only if
+        # uvicorn trusts the proxy (FORWARDED_ALLOW_IPS in config.py)
+        client = request.client.host if request.client else "unknown"
+        await self.check(request, f"ip:{client}")
+
+    async def check(self, request: Request, identity: str):
+        if not RATE_LIMIT_ENABLED:
+            return
+
+        key = f"rl:{request.method}:{request.scope['route'].path}:{identity}"
+        try:
+            current, previous = await _backend.hit(key, self.seconds)
+        except Exception as e:
+            # Fail open: a broken limiter backend must not take the API down
+            logger.warning(f"Rate limiter backend error: {str(e)}")
+            return
+
+        elapsed = (time.time() % self.seconds) / self.seconds
+        if current + previous * (1 - elapsed) > self.times:
+            metrics.inc("rate_limit_rejected")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, int(self.seconds * (1 - elapsed))))},
+            )
+
+
+class UserRateLimiter(RateLimiter):
+    """Same as RateLimiter, but counts requests per authenticated user"""
+
+    async def __call__(self, request: Request, current_user=Depends(get_current_user)):
+        await self.check(request, f"user:{current_user.id}")
+
+
+class ConcurrencyLimiter:
+    """Route dependency capping the number of requests in flight.
+
+    Requests over the cap are shed immediately with 503 instead of queueing
+    behind the ones already running.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    async def __call__(self):
+        if self.in_flight >= self.max_in_flight:
+            metrics.inc("load_shed")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": "1"},
+            )
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1